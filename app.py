@@ -1,18 +1,109 @@
 from creditcard.logger import logging
 from creditcard.exception import CreditCardException
-from flask import Flask
+from creditcard.config.configuration import Configuration
+from creditcard.entity.creditcard_predictor import CreditCardPredictor, InvalidRecordError
+from creditcard.entity.prediction_batcher import PredictionBatcher
+from creditcard.entity.drift_monitor import DriftMonitor
+from creditcard.constants import *
+from creditcard.util.util import read_yaml_file
+from flask import Flask, request, jsonify
 
 import sys, os
+import threading
 
 app=Flask(__name__)
 
+# One predictor per worker process, the model is unpickled on the first request only
+predictor = None
+batcher = None
+predictor_lock = threading.Lock()
+
+def get_predictor() -> CreditCardPredictor:
+    global predictor
+    if predictor is None:
+        with predictor_lock:
+            if predictor is None:
+                prediction_config = Configuration().get_prediction_config()
+                dataset_schema = read_yaml_file(file_path=prediction_config.schema_file_path)
+                drift_monitor = DriftMonitor.from_latest_reference(
+                    reference_histogram_dir=prediction_config.reference_histogram_dir,
+                    reference_histogram_file_name=prediction_config.reference_histogram_file_name,
+                    feature_columns=dataset_schema[ALL_FEATURE_COLUMNS],
+                    monitor_dir=prediction_config.drift_monitor_dir,
+                    flush_interval_s=prediction_config.drift_flush_interval_s,
+                    psi_threshold=prediction_config.psi_threshold,
+                    drift_share=prediction_config.drift_share,
+                    ignore_columns=[dataset_schema[COLUMN_TO_BE_DROPED]])
+                creditcard_predictor = CreditCardPredictor(model_dir=prediction_config.model_dir,
+                                                           model_file_name=prediction_config.model_file_name,
+                                                           schema_file_path=prediction_config.schema_file_path,
+                                                           drift_monitor=drift_monitor)
+                creditcard_predictor.load_model()
+                predictor = creditcard_predictor
+    return predictor
+
+def get_batcher() -> PredictionBatcher:
+    global batcher
+    if batcher is None:
+        creditcard_predictor = get_predictor()
+        with predictor_lock:
+            if batcher is None:
+                prediction_config = Configuration().get_prediction_config()
+                batcher = PredictionBatcher(predict_batch=creditcard_predictor.predict,
+                                            prepare_record=creditcard_predictor.get_record_row,
+                                            batch_window_ms=prediction_config.batch_window_ms,
+                                            max_batch_size=prediction_config.max_batch_size)
+    return batcher
+
 @app.route('/', methods=['GET', 'POST'])
 def home():
     try:
         #raise Exception('Custom Exception')
-        return ("Reaching here") 
+        return ("Reaching here")
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    try:
+        payload = request.get_json(force=True, silent=True)
+        if isinstance(payload, dict) and "records" not in payload:
+            return jsonify({"error": "Expected a \"records\" key holding the list of records"}), 400
+        records = payload["records"] if isinstance(payload, dict) else payload
+        if not isinstance(records, list):
+            return jsonify({"error": "Expected a list of records"}), 400
+        if len(records) == 0:
+            return jsonify({"predictions": []})
+        predictions = get_predictor().predict(records)
+        logging.info(f"Scored batch of size : [{len(records)}]")
+        return jsonify({"predictions": predictions})
+    except InvalidRecordError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    try:
+        record = request.get_json(force=True, silent=True)
+        if not isinstance(record, (dict, list)):
+            return jsonify({"error": "Expected a single record"}), 400
+        prediction = get_batcher().predict(record)
+        return jsonify({"prediction": prediction})
+    except InvalidRecordError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
+
+@app.route('/drift', methods=['GET'])
+def drift():
+    try:
+        drift_monitor = get_predictor().drift_monitor
+        if drift_monitor is None:
+            return jsonify({"error": "No drift reference histogram found, run the training pipeline first"}), 404
+        return jsonify(drift_monitor.get_drift())
     except Exception as e:
         raise CreditCardException(e, sys) from e
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -4,18 +4,33 @@ from creditcard.logger import logging
 from creditcard.exception import CreditCardException
 from creditcard.entity.config_entity import DataIngestionConfig
 from creditcard.entity.artifact_entity import DataIngestionArtifact
+from creditcard.util.util import read_yaml_file, write_yaml_file, get_file_hash, get_schema_dtypes, link_or_copy, \
+    read_dataframe, save_columnar_data, convert_csv_to_columnar, get_parse_dtypes
+from creditcard.constants import DATA_FORMAT_COLUMNAR, DATA_INGESTION_COMBINED_FILE_NAME, SCHEMA_COMPACT_DTYPES_KEY
 from sklearn.model_selection import StratifiedShuffleSplit
 
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
 import sys, os
-import filecmp
+import fnmatch
+import hashlib
+
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+#Source content and every setting that changes the ingested files
+INGESTION_FINGERPRINT_KEYS = ["sha256", "size", "split_chunk_size", "ingested_data_format",
+                              "schema_sha256", "compact_dtypes"]
 
 class DataIngestion:
     def __init__(self, data_ingestion_config: DataIngestionConfig):
         try:
             logging.info(f"{'=' *30} Data Ingestion log started . {'=' *30}")
             self.data_ingestion_config = data_ingestion_config
+            dataset_schema = read_yaml_file(file_path=data_ingestion_config.schema_file_path)
+            self.dtypes = get_schema_dtypes(schema_file_path=data_ingestion_config.schema_file_path)
+            self.compact_dtypes = dataset_schema.get(SCHEMA_COMPACT_DTYPES_KEY, False)
         except Exception as e:
             raise CreditCardException(e, sys) from e
     
@@ -33,31 +48,106 @@ class DataIngestion:
             logging.info(f"Raw data directory is this one : {raw_data_dir}")
             
             if os.path.exists(raw_data_dir):
-                 os.remove(raw_data_dir)
+                 shutil.rmtree(raw_data_dir)
             os.makedirs(raw_data_dir, exist_ok= True)
             
-            training_files = os.listdir(path=training_file_path)
-            logging.info(f" This is trianing fiel : {training_files}")
-            for train_file in training_files:
-                if training_file_name == train_file:
-                    source_path = os.path.join(training_file_path, train_file)
-                    destination_path = os.path.join(raw_data_dir, train_file)
-                    shutil.copy(src=source_path, dst=destination_path)
+            source_file_paths = self.get_source_file_paths()
+            logging.info(f" This is trianing fiel : {source_file_paths}")
+            destination_paths = [os.path.join(raw_data_dir, os.path.basename(source_path))
+                                 for source_path in source_file_paths]
+            with ThreadPoolExecutor(max_workers=self.get_max_workers()) as executor:
+                list(executor.map(link_or_copy, source_file_paths, destination_paths))
             
         except Exception as e:
             raise CreditCardException(e, sys) from e
     
+    def get_source_file_paths(self)->list:
+        """
+        training_file_name is one file name, a glob matching many partition files
+        or a directory whose files are all partitions
+        """
+        try:
+            training_file_path = self.data_ingestion_config.training_file_path
+            training_file_name = self.data_ingestion_config.training_file_name
+            if os.path.isdir(os.path.join(training_file_path, training_file_name)):
+                training_file_path = os.path.join(training_file_path, training_file_name)
+                training_file_name = "*"
+            source_file_paths = [os.path.join(training_file_path, train_file)
+                                 for train_file in sorted(os.listdir(path=training_file_path))
+                                 if fnmatch.fnmatch(train_file, training_file_name) and not train_file.startswith(".")]
+            if len(source_file_paths) == 0:
+                raise Exception(f"No file matching [{training_file_name}] in [{training_file_path}]")
+            return source_file_paths
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def get_max_workers(self)->int:
+        return self.data_ingestion_config.max_workers or os.cpu_count() or 1
+    
     def split_data_as_train_test(self) -> DataIngestionArtifact:
         try:
             #Extract the folder where the file is there
             raw_data_dir = self.data_ingestion_config.raw_data_dir
             
-            #Extract the file name in this folder only one file will be present
-            file_name = os.listdir(raw_data_dir)[0]
+            #Every partition file copied in this folder goes to the same train and test dataset
+            raw_file_names = sorted(os.listdir(raw_data_dir))
+            creditcard_file_paths = [os.path.join(raw_data_dir, raw_file_name) for raw_file_name in raw_file_names]
+            file_name = raw_file_names[0] if len(raw_file_names) == 1 else DATA_INGESTION_COMBINED_FILE_NAME
+            
+            train_file_path = os.path.join(self.data_ingestion_config.ingested_train_dir, file_name)
+            test_file_path = os.path.join(self.data_ingestion_config.ingested_test_dir, file_name)
+            
+            is_columnar = self.data_ingestion_config.ingested_data_format == DATA_FORMAT_COLUMNAR
+            if is_columnar:
+                #Columnar dataset is a directory named after the source file holding one .npy per column
+                train_file_path = os.path.splitext(train_file_path)[0]
+                test_file_path = os.path.splitext(test_file_path)[0]
+            
+            split_chunk_size = self.data_ingestion_config.split_chunk_size
+            if split_chunk_size and is_columnar:
+                csv_train_file_path = f"{train_file_path}.csv"
+                csv_test_file_path = f"{test_file_path}.csv"
+                self.split_data_in_chunks(creditcard_file_paths=creditcard_file_paths,
+                                          train_file_path=csv_train_file_path,
+                                          test_file_path=csv_test_file_path,
+                                          chunk_size=split_chunk_size)
+                for csv_file_path, file_path in [(csv_train_file_path, train_file_path), (csv_test_file_path, test_file_path)]:
+                    logging.info(f"Converting [{csv_file_path}] to columnar dataset : [{file_path}]")
+                    convert_csv_to_columnar(csv_file_path=csv_file_path, dir_path=file_path,
+                                            dtypes=self.dtypes, chunk_size=split_chunk_size,
+                                            compact=self.compact_dtypes)
+                    os.remove(csv_file_path)
+            elif split_chunk_size:
+                self.split_data_in_chunks(creditcard_file_paths=creditcard_file_paths,
+                                          train_file_path=train_file_path,
+                                          test_file_path=test_file_path,
+                                          chunk_size=split_chunk_size)
+            else:
+                self.split_data_in_memory(creditcard_file_paths=creditcard_file_paths,
+                                          train_file_path=train_file_path,
+                                          test_file_path=test_file_path)
+            
+            data_ingestion_artifact = DataIngestionArtifact(train_file_path=train_file_path,
+                                                            test_file_path=test_file_path,
+                                                            is_ingested=True,
+                                                            message=f"Data ingestion completed Successfully.")
+            logging.info(f"Data Ingestion artifact is this one : [{data_ingestion_artifact}]")
+            return data_ingestion_artifact
             
-            creditcard_file_path = os.path.join(raw_data_dir, file_name)
-            logging.info(f"Reading csv file : [{creditcard_file_path}]")
-            creditcard_data_frame = pd.read_csv(creditcard_file_path)
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def split_data_in_memory(self, creditcard_file_paths:list, train_file_path:str, test_file_path:str):
+        try:
+            logging.info(f"Reading csv file : {creditcard_file_paths}")
+            read_partition = partial(read_dataframe, dtypes=self.dtypes, compact=self.compact_dtypes)
+            if len(creditcard_file_paths) == 1:
+                creditcard_data_frame = read_partition(creditcard_file_paths[0])
+            else:
+                #Partitions are parsed concurrently, one worker process per file
+                with ProcessPoolExecutor(max_workers=min(self.get_max_workers(), len(creditcard_file_paths))) as executor:
+                    creditcard_data_frame = pd.concat(list(executor.map(read_partition, creditcard_file_paths)),
+                                                      ignore_index=True)
             
             #As its a classification problem so we can use target column for stratified split
             target_column = creditcard_data_frame.columns[-1]
@@ -66,39 +156,213 @@ class DataIngestion:
             logging.info(f"Splitting data into train and test")
             start_train_set = None
             start_test_set = None
-            split = StratifiedShuffleSplit(n_splits=1, test_size=0.2, random_state= 42)
+            split = StratifiedShuffleSplit(n_splits=1, test_size=TEST_SIZE, random_state=RANDOM_STATE)
             
             for train_index, test_index in split.split(creditcard_data_frame, creditcard_data_frame[target_column]):
                 start_train_set = creditcard_data_frame.loc[train_index]
                 start_test_set = creditcard_data_frame.loc[test_index]
             
-            train_file_path = os.path.join(self.data_ingestion_config.ingested_train_dir, file_name)
-            test_file_path = os.path.join(self.data_ingestion_config.ingested_test_dir, file_name)
-            
             if start_train_set is not None:
                 os.makedirs(self.data_ingestion_config.ingested_train_dir, exist_ok=True)
                 logging.info(f"Exporting training dataset to file : [{train_file_path}]")
-                start_train_set.to_csv(train_file_path, index=False)
+                self.save_dataset(dataframe=start_train_set, file_path=train_file_path)
             
             if start_test_set is not None:
                 os.makedirs(self.data_ingestion_config.ingested_test_dir, exist_ok=True)
                 logging.info(f"Exporting test dataset to file : [{test_file_path}]")
-                start_test_set.to_csv(test_file_path, index=False)
+                self.save_dataset(dataframe=start_test_set, file_path=test_file_path)
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def save_dataset(self, dataframe:pd.DataFrame, file_path:str):
+        try:
+            if self.data_ingestion_config.ingested_data_format == DATA_FORMAT_COLUMNAR:
+                #Parsed with the schema (or compact) dtypes already, keep them and the schema column order
+                dtypes = {column: dataframe[column].dtype for column in self.dtypes}
+                save_columnar_data(dir_path=file_path, dataframe=dataframe, dtypes=dtypes)
+            else:
+                dataframe.to_csv(file_path, index=False)
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    @staticmethod
+    def get_row_hash(row_number:np.ndarray, seed:int = RANDOM_STATE)->np.ndarray:
+        """
+        Deterministic pseudo random value in [0, 1) for every row number (splitmix64 finalizer).
+        """
+        value = row_number.astype(np.uint64) + np.uint64((seed * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF)
+        value = (value ^ (value >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        value = (value ^ (value >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        value = value ^ (value >> np.uint64(31))
+        return (value >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+    
+    def split_data_in_chunks(self, creditcard_file_paths:list, train_file_path:str, test_file_path:str,
+                             chunk_size:int):
+        """
+        Split every partition file concurrently into its own part files, then append the parts
+        into the train and test file. Partition i hashes its rows with seed RANDOM_STATE + i.
+        """
+        try:
+            os.makedirs(self.data_ingestion_config.ingested_train_dir, exist_ok=True)
+            os.makedirs(self.data_ingestion_config.ingested_test_dir, exist_ok=True)
+            if len(creditcard_file_paths) == 1:
+                DataIngestion.split_file_in_chunks(creditcard_file_paths[0], train_file_path, test_file_path,
+                                                   chunk_size, self.dtypes, RANDOM_STATE)
+                return
             
-            data_ingestion_artifact = DataIngestionArtifact(train_file_path=train_file_path,
-                                                            test_file_path=test_file_path,
-                                                            is_ingested=True,
-                                                            message=f"Data ingestion completed Successfully.")
-            logging.info(f"Data Ingestion artifact is this one : [{data_ingestion_artifact}]")
-            return data_ingestion_artifact
+            part_train_file_paths = [f"{train_file_path}.part{index}" for index in range(len(creditcard_file_paths))]
+            part_test_file_paths = [f"{test_file_path}.part{index}" for index in range(len(creditcard_file_paths))]
+            with ProcessPoolExecutor(max_workers=min(self.get_max_workers(), len(creditcard_file_paths))) as executor:
+                list(executor.map(DataIngestion.split_file_in_chunks, creditcard_file_paths,
+                                  part_train_file_paths, part_test_file_paths,
+                                  [chunk_size] * len(creditcard_file_paths),
+                                  [self.dtypes] * len(creditcard_file_paths),
+                                  [RANDOM_STATE + index for index in range(len(creditcard_file_paths))]))
+            for file_path, part_file_paths in [(train_file_path, part_train_file_paths), (test_file_path, part_test_file_paths)]:
+                DataIngestion.concatenate_csv_files(part_file_paths=part_file_paths, file_path=file_path)
+            logging.info(f"Exported training dataset to file : [{train_file_path}] and test dataset to file : [{test_file_path}]")
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    @staticmethod
+    def concatenate_csv_files(part_file_paths:list, file_path:str):
+        """
+        Byte level append of csv part files keeping only the first header, the parts are removed
+        """
+        try:
+            with open(file_path, "wb") as output_file:
+                for index, part_file_path in enumerate(part_file_paths):
+                    with open(part_file_path, "rb") as part_file:
+                        header = part_file.readline()
+                        if index == 0:
+                            output_file.write(header)
+                        shutil.copyfileobj(part_file, output_file)
+                    os.remove(part_file_path)
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    @staticmethod
+    def split_file_in_chunks(creditcard_file_path:str, train_file_path:str, test_file_path:str,
+                             chunk_size:int, dtypes:dict, seed:int = RANDOM_STATE):
+        """
+        Stratified train/test split that never holds more than one chunk in memory.
+        Inside every chunk the rows of each label are ordered by their row hash and the first ones
+        go to the test file, as many as needed to keep every label's running test share at TEST_SIZE.
+        """
+        try:
+            logging.info(f"Splitting csv file : [{creditcard_file_path}] in chunks of [{chunk_size}] rows")
+            seen_count = {}
+            test_count = {}
+            row_offset = 0
+            for chunk_number, chunk in enumerate(pd.read_csv(creditcard_file_path, dtype=get_parse_dtypes(dtypes),
+                                                                            chunksize=chunk_size)):
+                #As its a classification problem so we can use target column for stratified split
+                #Rows with a missing target match no label and stay in the train file, where validation reports them
+                target_value = chunk[chunk.columns[-1]].to_numpy(dtype=np.float64, na_value=np.nan)
+                row_hash = DataIngestion.get_row_hash(np.arange(row_offset, row_offset + len(chunk)), seed=seed)
+                row_offset += len(chunk)
+                
+                is_test = np.zeros(len(chunk), dtype=bool)
+                for label in np.unique(target_value):
+                    label_index = np.flatnonzero(target_value == label)
+                    seen_count[label] = seen_count.get(label, 0) + len(label_index)
+                    label_test_count = int(round(seen_count[label] * TEST_SIZE)) - test_count.get(label, 0)
+                    test_count[label] = test_count.get(label, 0) + label_test_count
+                    is_test[label_index[np.argsort(row_hash[label_index], kind="stable")[:label_test_count]]] = True
+                
+                mode, header = ("w", True) if chunk_number == 0 else ("a", False)
+                chunk[~is_test].to_csv(train_file_path, mode=mode, header=header, index=False)
+                chunk[is_test].to_csv(test_file_path, mode=mode, header=header, index=False)
+            
+            logging.info(f"Rows per label : {seen_count}, test rows per label : {test_count}")
+            logging.info(f"Exported training dataset to file : [{train_file_path}] and test dataset to file : [{test_file_path}]")
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def get_source_fingerprint(self, ingestion_index:list)->dict:
+        """
+        Size, modification time and sha256 of every source file plus the split settings and
+        the schema.yaml hash, which decides the dtypes of the ingested files.
+        A file hash is only recomputed when its size or modification time differ from the indexed one.
+        """
+        try:
+            indexed_files = {}
+            for entry in ingestion_index:
+                for source_file in entry.get("source_files", []):
+                    indexed_files[(source_file["path"], source_file["size"], source_file["mtime_ns"])] = source_file["sha256"]
+            
+            source_files = []
+            for source_file_path in self.get_source_file_paths():
+                file_stat = os.stat(source_file_path)
+                source_files.append({"path": source_file_path,
+                                     "size": file_stat.st_size,
+                                     "mtime_ns": file_stat.st_mtime_ns})
+            files_to_hash = [source_file for source_file in source_files
+                             if (source_file["path"], source_file["size"], source_file["mtime_ns"]) not in indexed_files]
+            logging.info(f"Hashing source file : {[source_file['path'] for source_file in files_to_hash]}")
+            with ThreadPoolExecutor(max_workers=self.get_max_workers()) as executor:
+                file_hashes = list(executor.map(get_file_hash, [source_file["path"] for source_file in files_to_hash]))
+            for source_file, file_hash in zip(files_to_hash, file_hashes):
+                source_file["sha256"] = file_hash
+            for source_file in source_files:
+                if "sha256" not in source_file:
+                    source_file["sha256"] = indexed_files[(source_file["path"], source_file["size"], source_file["mtime_ns"])]
             
+            dataset_hash = hashlib.sha256()
+            for source_file in source_files:
+                dataset_hash.update(f"{os.path.basename(source_file['path'])}:{source_file['sha256']}\n".encode())
+            return {"source_files": source_files,
+                    "sha256": dataset_hash.hexdigest(),
+                    "size": sum(source_file["size"] for source_file in source_files),
+                    "split_chunk_size": self.data_ingestion_config.split_chunk_size,
+                    "ingested_data_format": self.data_ingestion_config.ingested_data_format,
+                    "schema_sha256": get_file_hash(self.data_ingestion_config.schema_file_path),
+                    "compact_dtypes": self.compact_dtypes}
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    @staticmethod
+    def get_previous_ingestion_artifact(ingestion_index:list, fingerprint:dict)->DataIngestionArtifact:
+        try:
+            for entry in reversed(ingestion_index):
+                is_same_data = all(entry.get(key) == fingerprint[key] for key in INGESTION_FINGERPRINT_KEYS)
+                if is_same_data and os.path.exists(entry["train_file_path"]) and os.path.exists(entry["test_file_path"]):
+                    return DataIngestionArtifact(train_file_path=entry["train_file_path"],
+                                                 test_file_path=entry["test_file_path"],
+                                                 is_ingested=True,
+                                                 message=f"Source data unchanged, reusing previous ingestion.")
+            return None
         except Exception as e:
             raise CreditCardException(e, sys) from e
     
     def initiate_data_ingestion(self)-> DataIngestionArtifact:
         try:
-            self.copy_creditcard_data()
-            return self.split_data_as_train_test()
+            if not self.data_ingestion_config.reuse_ingested_data:
+                self.copy_creditcard_data()
+                return self.split_data_as_train_test()
+            
+            ingestion_index_file_path = self.data_ingestion_config.ingestion_index_file_path
+            ingestion_index = []
+            if os.path.exists(ingestion_index_file_path):
+                ingestion_index = read_yaml_file(file_path=ingestion_index_file_path) or []
+            
+            fingerprint = self.get_source_fingerprint(ingestion_index=ingestion_index)
+            data_ingestion_artifact = DataIngestion.get_previous_ingestion_artifact(ingestion_index=ingestion_index,
+                                                                                   fingerprint=fingerprint)
+            if data_ingestion_artifact is not None:
+                logging.info(f"Source file fingerprint matched, reusing artifact : [{data_ingestion_artifact}]")
+            else:
+                self.copy_creditcard_data()
+                data_ingestion_artifact = self.split_data_as_train_test()
+            
+            #Latest fingerprint per artifact, so a touched but unchanged file is hashed only once
+            fingerprint["train_file_path"] = data_ingestion_artifact.train_file_path
+            fingerprint["test_file_path"] = data_ingestion_artifact.test_file_path
+            ingestion_index = [entry for entry in ingestion_index
+                               if entry["train_file_path"] != fingerprint["train_file_path"]]
+            ingestion_index.append(fingerprint)
+            write_yaml_file(file_path=ingestion_index_file_path, data=ingestion_index)
+            return data_ingestion_artifact
         
         except Exception as e:
             raise CreditCardException(e, sys) from e
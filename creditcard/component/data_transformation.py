@@ -10,32 +10,113 @@ from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 
 import sys, os
+import json
+import hashlib
+import shutil
+import sklearn
 import scipy.stats as stat
+from scipy import special
+from concurrent.futures import ProcessPoolExecutor
+
+#Seed of the row sample the Box cox lambdas are fitted on in chunked mode
+RANDOM_STATE = 42
+#Shards per worker in sharded mode, more shards than workers keeps the pool busy till the end
+SHARDS_PER_WORKER = 4
+
+#Artifact field -> file name inside a transformation cache entry
+TRANSFORMATION_CACHE_ENTRY_FILES = {"transformed_train_file_path": "train_input.npy",
+                                    "transformed_train_target_file_path": "train_target.npy",
+                                    "transformed_test_file_path": "test_input.npy",
+                                    "transformed_test_target_file_path": "test_target.npy",
+                                    "preprocessed_object_file_path": "preprocessed.pkl"}
+
+#Fitted preprocessing object of a shard worker, sent once per process by the pool initializer
+_shard_preprocessing_object = None
+
+
+def _init_shard_worker(preprocessing_object:ColumnTransformer):
+    global _shard_preprocessing_object
+    _shard_preprocessing_object = preprocessing_object
+
+
+def _transform_shard(input_df:pd.DataFrame, output_file_path:str, start:int)->int:
+    """
+    Transform one row shard and write it into its slice of the shared output .npy file
+    """
+    output_array = np.lib.format.open_memmap(output_file_path, mode="r+")
+    output_array[start:start + len(input_df)] = _shard_preprocessing_object.transform(input_df)
+    output_array.flush()
+    return len(input_df)
 
 class FeatureGenerator(BaseEstimator, TransformerMixin):
 
     def __init__(self, column_to_be_droped, column_needs_to_replace_value,
-                 coumn_needs_to_be_transformed_to_normal_distribution)->None:
+                 coumn_needs_to_be_transformed_to_normal_distribution, all_feature_columns=None)->None:
        self.column_to_be_droped = column_to_be_droped
        self.column_needs_to_replace_value = column_needs_to_replace_value
        self.coumn_needs_to_be_transformed_to_normal_distribution = coumn_needs_to_be_transformed_to_normal_distribution
+       self.all_feature_columns = all_feature_columns
 
     def fit(self, X, y=None):
-        return self
+        try:
+            #Resolve the schema column names to integer indices once for the ndarray path
+            input_columns = list(X.columns) if isinstance(X, pd.DataFrame) else list(self.all_feature_columns)
+            self.keep_index_ = np.array([index for index, column in enumerate(input_columns)
+                                         if column != self.column_to_be_droped])
+            output_columns = [input_columns[index] for index in self.keep_index_]
+            self.replace_index_ = output_columns.index(self.column_needs_to_replace_value)
+            self.boxcox_index_ = np.array([output_columns.index(column)
+                                           for column in self.coumn_needs_to_be_transformed_to_normal_distribution])
+
+            #Estimate the Box cox lambda once on the training data, transform only applies it
+            input_boxcox_index = self.keep_index_[self.boxcox_index_]
+            if isinstance(X, pd.DataFrame):
+                column_value = X.iloc[:, input_boxcox_index].to_numpy(dtype=np.float64, copy=True)
+            else:
+                column_value = np.asarray(X, dtype=np.float64)[:, input_boxcox_index]
+            np.maximum(column_value, 0, out=column_value)
+            column_value += 1
+            self.lambdas_ = np.array([stat.boxcox(column_value[:, index])[1]
+                                      for index in range(column_value.shape[1])])
+            return self
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
 
     def transform(self, X, y=None):
         try:
+            if not isinstance(X, pd.DataFrame):
+                return self.transform_array(X)
             #Drop the Id column from the Dataframe
             X = X.drop([self.column_to_be_droped], axis=1)
             #Change the SEX column value previously it was (1=male, 2=female) we will convert this to (1=male, 0=female)
             X[self.column_needs_to_replace_value] = X[self.column_needs_to_replace_value].map({2:0, 1:1})
             
-            #Apply Box cox transformation to get a data in normal distribution
-            for column in self.coumn_needs_to_be_transformed_to_normal_distribution:
-                if X[column].min() < 0:
-                     X.loc[X[column] < 0, column] = 0
-                transformed_column_value, param = stat.boxcox(X[column]+1)
-                X[column] = transformed_column_value
+            #Apply Box cox transformation with the fitted lambda to all the columns in one pass
+            columns = self.coumn_needs_to_be_transformed_to_normal_distribution
+            column_value = X[columns].to_numpy(dtype=np.float64, copy=True)
+            np.maximum(column_value, 0, out=column_value)
+            column_value += 1
+            X[columns] = special.boxcox(column_value, self.lambdas_)
+            return X
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def transform_array(self, X):
+        """
+        Same transformation as the DataFrame path on a raw array in all_feature_columns order.
+        Only the column selection copies the input, the remap, clip and Box cox write back into that copy.
+        """
+        try:
+            X = np.asarray(X, dtype=np.float64)[:, self.keep_index_]
+
+            #SEX (1=male, 2=female) -> (1=male, 0=female), any other code becomes nan like Series.map
+            column_value = X[:, self.replace_index_]
+            column_value[:] = np.where(column_value == 1, 1.0, np.where(column_value == 2, 0.0, np.nan))
+
+            column_value = X[:, self.boxcox_index_]
+            np.maximum(column_value, 0, out=column_value)
+            column_value += 1
+            X[:, self.boxcox_index_] = special.boxcox(column_value, self.lambdas_)
             return X
         except Exception as e:
             raise CreditCardException(e, sys) from e
@@ -69,7 +150,8 @@ class DataTransformation:
                 ('feature_generator', FeatureGenerator(
                     column_to_be_droped=column_to_be_droped,
                     column_needs_to_replace_value=column_needs_to_replace_value,
-                    coumn_needs_to_be_transformed_to_normal_distribution=coumn_needs_to_be_transformed_to_normal_distribution)),
+                    coumn_needs_to_be_transformed_to_normal_distribution=coumn_needs_to_be_transformed_to_normal_distribution,
+                    all_feature_columns=dataset_schema[ALL_FEATURE_COLUMNS])),
                 ('sclar', StandardScaler())
             ])
             preprocessing = ColumnTransformer([
@@ -79,63 +161,300 @@ class DataTransformation:
         except Exception as e:  
             raise CreditCardException(e, sys) from e
     
-    def initiate_data_transformation(self)->DataTransformationArtifact:
+    def get_sample_dataframe(self, file_path:str, chunk_size:int, sample_size:int, dtypes:dict):
+        """
+        Uniform bottom-k sample of the rows: every row gets a random key and the sample_size
+        smallest keys are kept while the file is streamed, so only one chunk plus the sample is in memory
+        return: (sample dataframe, number of rows in the file)
+        """
         try:
-            logging.info(f"Obtaining Preprocessing Object")
-            preprocessing_object = self.get_data_transformer_object()
+            rng = np.random.RandomState(RANDOM_STATE)
+            sample_df = None
+            sample_key = np.array([], dtype=np.float64)
+            number_of_rows = 0
+            for chunk in iter_dataframe_chunks(file_path=file_path, chunk_size=chunk_size, dtypes=dtypes):
+                number_of_rows += len(chunk)
+                sample_df = chunk if sample_df is None else pd.concat([sample_df, chunk], ignore_index=True)
+                sample_key = np.concatenate([sample_key, rng.random_sample(len(chunk))])
+                if len(sample_key) > sample_size:
+                    keep_index = np.sort(np.argpartition(sample_key, sample_size)[:sample_size])
+                    sample_df = sample_df.iloc[keep_index].reset_index(drop=True)
+                    sample_key = sample_key[keep_index]
+            return sample_df, number_of_rows
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def fit_transform_in_chunks(self, preprocessing_object:ColumnTransformer, file_path:str, target_column_name:str,
+                                input_file_path:str, target_file_path:str, chunk_size:int, dtypes:dict):
+        """
+        Out of core fit_transform of the training file.
+        Pass 1 draws the sample the column selection and Box cox lambdas are fitted on.
+        Pass 2 feature generates every chunk, updates the scaler with partial_fit and writes the
+        unscaled block into the preallocated memory mapped output.
+        The output is then scaled in place block by block and the streamed scaler replaces the sample one.
+        """
+        try:
+            sample_size = self.data_transformation_config.lambda_sample_size
+            sample_df, number_of_rows = self.get_sample_dataframe(file_path=file_path, chunk_size=chunk_size,
+                                                                  sample_size=sample_size, dtypes=dtypes)
+            logging.info(f"Fitting preprocessing object on a sample of [{len(sample_df)}/{number_of_rows}] rows")
+            preprocessing_object.fit(sample_df.drop(columns=[target_column_name]))
+            _, pipeline, _ = preprocessing_object.transformers_[0]
+            feature_generator = pipeline.named_steps['feature_generator']
+            scaler = StandardScaler()
+            
+            input_array = None
+            target_array = np.lib.format.open_memmap(target_file_path, mode="w+", dtype=np.int8, shape=(number_of_rows,))
+            row_offset = 0
+            for chunk in iter_dataframe_chunks(file_path=file_path, chunk_size=chunk_size, dtypes=dtypes):
+                generated_feature = feature_generator.transform(chunk[preprocessing_object.transformers_[0][2]])
+                scaler.partial_fit(generated_feature)
+                if input_array is None:
+                    input_array = np.lib.format.open_memmap(input_file_path, mode="w+",
+                                                            dtype=np.dtype(self.data_transformation_config.transformed_dtype),
+                                                            shape=(number_of_rows, generated_feature.shape[1]))
+                input_array[row_offset:row_offset + len(chunk)] = generated_feature
+                target_array[row_offset:row_offset + len(chunk)] = chunk[target_column_name].to_numpy(dtype=np.int8)
+                row_offset += len(chunk)
+            
+            #The scaler was fitted on feature generated DataFrames, so the blocks get the same column names back
+            for start in range(0, number_of_rows, chunk_size):
+                block = pd.DataFrame(np.asarray(input_array[start:start + chunk_size]), columns=scaler.feature_names_in_)
+                input_array[start:start + chunk_size] = scaler.transform(block)
+            pipeline.steps[-1] = ('sclar', scaler)
+            input_array.flush()
+            target_array.flush()
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def transform_in_chunks(self, preprocessing_object:ColumnTransformer, file_path:str, target_column_name:str,
+                            input_file_path:str, target_file_path:str, chunk_size:int, dtypes:dict):
+        """
+        Transform a file with the fitted preprocessing object block by block into memory mapped output files
+        """
+        try:
+            number_of_rows = sum(len(chunk) for chunk in iter_dataframe_chunks(file_path=file_path, chunk_size=chunk_size, dtypes=dtypes))
+            input_array = None
+            target_array = np.lib.format.open_memmap(target_file_path, mode="w+", dtype=np.int8, shape=(number_of_rows,))
+            row_offset = 0
+            for chunk in iter_dataframe_chunks(file_path=file_path, chunk_size=chunk_size, dtypes=dtypes):
+                transformed_feature = preprocessing_object.transform(chunk.drop(columns=[target_column_name]))
+                if input_array is None:
+                    input_array = np.lib.format.open_memmap(input_file_path, mode="w+",
+                                                            dtype=np.dtype(self.data_transformation_config.transformed_dtype),
+                                                            shape=(number_of_rows, transformed_feature.shape[1]))
+                input_array[row_offset:row_offset + len(chunk)] = transformed_feature
+                target_array[row_offset:row_offset + len(chunk)] = chunk[target_column_name].to_numpy(dtype=np.int8)
+                row_offset += len(chunk)
+            input_array.flush()
+            target_array.flush()
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def get_max_workers(self)->int:
+        return self.data_transformation_config.max_workers or os.cpu_count() or 1
+    
+    def transform_in_shards(self, preprocessing_object:ColumnTransformer, input_df:pd.DataFrame, output_file_path:str):
+        """
+        Transform the rows of a dataframe with a fitted preprocessing object in a process pool.
+        The transform is row independent, so every worker transforms one row shard and writes it
+        straight into its slice of the preallocated output .npy file.
+        """
+        try:
+            max_workers = self.get_max_workers()
+            #Width of the output is taken from one row transformed here
+            number_of_columns = preprocessing_object.transform(input_df.iloc[:1]).shape[1]
+            output_array = np.lib.format.open_memmap(output_file_path, mode="w+",
+                                                     dtype=np.dtype(self.data_transformation_config.transformed_dtype),
+                                                     shape=(len(input_df), number_of_columns))
+            del output_array
+            shard_size = max(-(-len(input_df) // (max_workers * SHARDS_PER_WORKER)), 1)
+            logging.info(f"Transforming [{len(input_df)}] rows in shards of [{shard_size}] rows with [{max_workers}] workers into : [{output_file_path}]")
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_shard_worker,
+                                     initargs=(preprocessing_object,)) as executor:
+                futures = [executor.submit(_transform_shard, input_df.iloc[start:start + shard_size], output_file_path, start)
+                           for start in range(0, len(input_df), shard_size)]
+                transformed_rows = sum(future.result() for future in futures)
+            if transformed_rows != len(input_df):
+                raise Exception(f"Only [{transformed_rows}/{len(input_df)}] rows were written to [{output_file_path}]")
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def get_transformation_key(self)->str:
+        """
+        sha256 over everything the fitted preprocessing object and the transformed arrays depend on:
+        ingested train and test data, schema, code of this module, library versions and output settings.
+        return: None when the transformation cache is disabled
+        """
+        try:
+            if not self.data_transformation_config.transformation_cache_size:
+                return None
+            key_parts = {"train": get_path_hash(self.data_ingestion_artifact.train_file_path),
+                         "test": get_path_hash(self.data_ingestion_artifact.test_file_path),
+                         "schema": get_file_hash(self.data_validation_artifact.schema_file_path),
+                         "code": get_file_hash(os.path.abspath(__file__)),
+                         "sklearn": sklearn.__version__,
+                         "numpy": np.__version__,
+                         "transformed_dtype": self.data_transformation_config.transformed_dtype,
+                         "transform_chunk_size": self.data_transformation_config.transform_chunk_size,
+                         "lambda_sample_size": self.data_transformation_config.lambda_sample_size}
+            return hashlib.sha256(json.dumps(key_parts, sort_keys=True).encode()).hexdigest()
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def load_cached_transformation(self, transformation_key:str, data_transformation_artifact:DataTransformationArtifact)->bool:
+        """
+        Link the files of a cache entry to the paths of the artifact
+        return: True on a cache hit
+        """
+        try:
+            if transformation_key is None:
+                return False
+            entry_dir = os.path.join(self.data_transformation_config.transformation_cache_dir, transformation_key)
+            if not os.path.isdir(entry_dir):
+                return False
+            for field, file_name in TRANSFORMATION_CACHE_ENTRY_FILES.items():
+                file_path = getattr(data_transformation_artifact, field)
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                link_or_copy(os.path.join(entry_dir, file_name), file_path)
+            #Modification time of the entry folder is its last use for the LRU eviction
+            os.utime(entry_dir)
+            return True
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def save_transformation_to_cache(self, transformation_key:str, data_transformation_artifact:DataTransformationArtifact):
+        """
+        Add the artifact files as a new cache entry and evict the least recently used entries
+        """
+        try:
+            if transformation_key is None:
+                return
+            cache_dir = self.data_transformation_config.transformation_cache_dir
+            entry_dir = os.path.join(cache_dir, transformation_key)
+            #Entry is assembled aside and renamed, so a reader never sees a partial entry
+            temporary_dir = f"{entry_dir}.{os.getpid()}.tmp"
+            os.makedirs(temporary_dir, exist_ok=True)
+            for field, file_name in TRANSFORMATION_CACHE_ENTRY_FILES.items():
+                link_or_copy(getattr(data_transformation_artifact, field), os.path.join(temporary_dir, file_name))
+            try:
+                os.rename(temporary_dir, entry_dir)
+                logging.info(f"Saved transformation cache entry : [{entry_dir}]")
+            except OSError:
+                #Another run saved the same entry first
+                shutil.rmtree(temporary_dir)
             
+            entry_dirs = [os.path.join(cache_dir, entry_name) for entry_name in os.listdir(cache_dir)
+                          if not entry_name.endswith(".tmp")]
+            entry_dirs.sort(key=os.path.getmtime, reverse=True)
+            for evicted_dir in entry_dirs[self.data_transformation_config.transformation_cache_size:]:
+                logging.info(f"Evicting transformation cache entry : [{evicted_dir}]")
+                shutil.rmtree(evicted_dir, ignore_errors=True)
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def initiate_data_transformation(self)->DataTransformationArtifact:
+        try:
             logging.info(f"Obtaining the training and testing filr path")
             training_file_path = self.data_ingestion_artifact.train_file_path
             testing_file_path = self.data_ingestion_artifact.test_file_path
             
             schema_file_path = self.data_validation_artifact.schema_file_path
-            
-            logging.info(f"Loading training data as Pandas Dataframe.")
-            train_df = load_data(file_path = training_file_path, schema_file_path = schema_file_path)
-            test_df = load_data(file_path = testing_file_path, schema_file_path = schema_file_path)
-            
             schema = read_yaml_file(file_path= schema_file_path)
             target_column_name = schema[TARGET_COLUMN_KEY]
             
-            logging.info(f"Splitting input and target feature from training and testing dataframe")
-            input_feature_train_df = train_df.drop(columns=[target_column_name], axis=1)
-            target_feature_train_df = train_df[target_column_name]
-            
-            input_feature_test_df = test_df.drop(columns=[target_column_name], axis=1)
-            target_feature_test_df = test_df[target_column_name]
-            
-            logging.info(f"Applying preprocessing object on training dataframe and testing dataframe")
-            input_feature_train_arr = preprocessing_object.fit_transform(input_feature_train_df)
-            input_feature_test_arr = preprocessing_object.transform(input_feature_test_df)
-            
-            train_arr = np.c_[input_feature_train_arr, np.array(target_feature_train_df)]
-            test_arr = np.c_[input_feature_test_arr, np.array(target_feature_test_df)]
-            
             transformed_train_dir = self.data_transformation_config.transformed_train_dir
             transformed_test_dir = self.data_transformation_config.transformed_test_dir
             
-            train_file_name = os.path.basename(training_file_path).replace(".csv", ".npz")
-            test_file_name = os.path.basename(testing_file_path).replace(".csv", ".npz")
-            
-            transformed_train_file_path = os.path.join(transformed_train_dir, train_file_name)
-            transformed_test_file_path = os.path.join(transformed_test_dir, test_file_name)
-            
-            logging.info(f"Saving transformed training and testing array.")
-            logging.info(f"Start Saving the transformed train file in the: {transformed_train_dir} and tranasformed test file in the {transformed_test_dir}")
-            save_numpy_array_data(transformed_train_file_path, train_arr)
-            save_numpy_array_data(transformed_test_file_path, test_arr)
+            train_file_name = os.path.splitext(os.path.basename(training_file_path))[0]
+            test_file_name = os.path.splitext(os.path.basename(testing_file_path))[0]
             
+            transformed_train_file_path = os.path.join(transformed_train_dir, train_file_name + TRANSFORMED_INPUT_FILE_SUFFIX)
+            transformed_test_file_path = os.path.join(transformed_test_dir, test_file_name + TRANSFORMED_INPUT_FILE_SUFFIX)
+            transformed_train_target_file_path = os.path.join(transformed_train_dir, train_file_name + TRANSFORMED_TARGET_FILE_SUFFIX)
+            transformed_test_target_file_path = os.path.join(transformed_test_dir, test_file_name + TRANSFORMED_TARGET_FILE_SUFFIX)
             preprocessing_obj_file_path = self.data_transformation_config.preprocessed_object_file_path
-            logging.info(f"Saving preprocessing object.")
-            save_object(file_path=preprocessing_obj_file_path, obj=preprocessing_object)
             
             data_transformation_artifact = DataTransformationArtifact(
                 message="Data Transformed Successfully",
                 transformed_train_file_path=transformed_train_file_path,
                 transformed_test_file_path= transformed_test_file_path,
                 preprocessed_object_file_path=preprocessing_obj_file_path,
+                transformed_train_target_file_path=transformed_train_target_file_path,
+                transformed_test_target_file_path=transformed_test_target_file_path,
                 is_transformed= True
             )
+            
+            transformation_key = self.get_transformation_key()
+            if self.load_cached_transformation(transformation_key=transformation_key,
+                                               data_transformation_artifact=data_transformation_artifact):
+                data_transformation_artifact = data_transformation_artifact._replace(
+                    message="Ingested data, schema and code unchanged, reusing cached transformation")
+                logging.info(f"Transformation cache hit : [{transformation_key}], artifact: {data_transformation_artifact}")
+                return data_transformation_artifact
+            
+            logging.info(f"Obtaining Preprocessing Object")
+            preprocessing_object = self.get_data_transformer_object()
+            
+            chunk_size = self.data_transformation_config.transform_chunk_size
+            if chunk_size:
+                logging.info(f"Transforming training and testing data in chunks of [{chunk_size}] rows")
+                os.makedirs(transformed_train_dir, exist_ok=True)
+                os.makedirs(transformed_test_dir, exist_ok=True)
+                dtypes = get_schema_dtypes(schema_file_path=schema_file_path)
+                self.fit_transform_in_chunks(preprocessing_object=preprocessing_object, file_path=training_file_path,
+                                             target_column_name=target_column_name,
+                                             input_file_path=transformed_train_file_path,
+                                             target_file_path=transformed_train_target_file_path,
+                                             chunk_size=chunk_size, dtypes=dtypes)
+                self.transform_in_chunks(preprocessing_object=preprocessing_object, file_path=testing_file_path,
+                                         target_column_name=target_column_name,
+                                         input_file_path=transformed_test_file_path,
+                                         target_file_path=transformed_test_target_file_path,
+                                         chunk_size=chunk_size, dtypes=dtypes)
+            else:
+                logging.info(f"Loading training data as Pandas Dataframe.")
+                train_df = load_data(file_path = training_file_path, schema_file_path = schema_file_path)
+                test_df = load_data(file_path = testing_file_path, schema_file_path = schema_file_path)
+                
+                logging.info(f"Splitting input and target feature from training and testing dataframe")
+                input_feature_train_df = train_df.drop(columns=[target_column_name])
+                target_feature_train_df = train_df[target_column_name]
+                
+                input_feature_test_df = test_df.drop(columns=[target_column_name])
+                target_feature_test_df = test_df[target_column_name]
+                
+                #Input features and target are saved as separate arrays, no concatenated copy is built
+                transformed_dtype = np.dtype(self.data_transformation_config.transformed_dtype)
+                if self.get_max_workers() > 1:
+                    logging.info(f"Fitting preprocessing object on training dataframe")
+                    preprocessing_object.fit(input_feature_train_df)
+                    os.makedirs(transformed_train_dir, exist_ok=True)
+                    os.makedirs(transformed_test_dir, exist_ok=True)
+                    self.transform_in_shards(preprocessing_object=preprocessing_object, input_df=input_feature_train_df,
+                                             output_file_path=transformed_train_file_path)
+                    self.transform_in_shards(preprocessing_object=preprocessing_object, input_df=input_feature_test_df,
+                                             output_file_path=transformed_test_file_path)
+                else:
+                    logging.info(f"Applying preprocessing object on training dataframe and testing dataframe")
+                    input_feature_train_arr = preprocessing_object.fit_transform(input_feature_train_df).astype(transformed_dtype, copy=False)
+                    input_feature_test_arr = preprocessing_object.transform(input_feature_test_df).astype(transformed_dtype, copy=False)
+                    
+                    logging.info(f"Saving transformed training and testing array.")
+                    logging.info(f"Start Saving the transformed train file in the: {transformed_train_dir} and tranasformed test file in the {transformed_test_dir}")
+                    save_numpy_array_data(transformed_train_file_path, input_feature_train_arr)
+                    save_numpy_array_data(transformed_test_file_path, input_feature_test_arr)
+                
+                save_numpy_array_data(transformed_train_target_file_path, target_feature_train_df.to_numpy(dtype=np.int8))
+                save_numpy_array_data(transformed_test_target_file_path, target_feature_test_df.to_numpy(dtype=np.int8))
+            
+            logging.info(f"Saving preprocessing object.")
+            save_object(file_path=preprocessing_obj_file_path, obj=preprocessing_object)
+            self.save_transformation_to_cache(transformation_key=transformation_key,
+                                              data_transformation_artifact=data_transformation_artifact)
+            
             logging.info(f"Data transformationa artifact: {data_transformation_artifact}")
             return data_transformation_artifact 
         except Exception as e:
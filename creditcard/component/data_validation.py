@@ -5,13 +5,12 @@ from creditcard.entity.config_entity import DataValidationConfig
 from creditcard.util.util import *
 from creditcard.constants import *
 
-from evidently.model_profile import Profile
-from evidently.model_profile.sections import DataDriftProfileSection
-from evidently.dashboard import Dashboard
-from evidently.dashboard.tabs import DataDriftTab
+from creditcard.entity.schema_constraint import SchemaConstraints
+from creditcard.entity.drift_engine import DriftEngine, SAMPLING_MODE_FULL, SAMPLING_MODE_FIXED
 import sys, os
 import pandas as pd
 import json
+import multiprocessing
 
 class DataValidation:
     def __init__(self, data_validation_config: DataValidationConfig,
@@ -20,24 +19,107 @@ class DataValidation:
             logging.info(f"{'=' *30} Data Validation log started . {'=' *30}")
             self.data_validation_config = data_validation_config
             self.data_ingestion_artifact = data_ingestion_artifact
+            #Loaded and computed on first use, shared by the schema check, the json report and the page
+            self.train_df = None
+            self.test_df = None
+            self.data_drift_report = None
+            self.data_drift_sampling = None
+            #Set by save_data_drift_report_page, the page path only when it is already saved
+            self.report_page_file_path = None
+            self.report_page_process = None
         except Exception as e:
             raise CreditCardException(e, sys) from e
     
     def get_train_and_test_df(self):
         try:
-            train_df = pd.read_csv(self.data_ingestion_artifact.train_file_path)
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_path)
+            if self.train_df is not None and self.test_df is not None:
+                return self.train_df, self.test_df
+            schema_file_path = self.data_validation_config.schema_file_path
+            dtypes = get_schema_dtypes(schema_file_path=schema_file_path)
+            compact = read_yaml_file(file_path=schema_file_path).get(SCHEMA_COMPACT_DTYPES_KEY, False)
+            train_df = read_dataframe(file_path=self.data_ingestion_artifact.train_file_path, dtypes=dtypes, compact=compact)
+            test_df = read_dataframe(file_path=self.data_ingestion_artifact.test_file_path, dtypes=dtypes, compact=compact)
+            self.train_df, self.test_df = train_df, test_df
             return train_df, test_df
         except Exception as e:
             raise CreditCardException(e, sys) from e
+    
+    def get_evidently_train_and_test_df(self):
+        """
+        Frames handed to evidently, evidently only supports one fixed stratified sample
+        """
+        try:
+            train_df, test_df = self.get_train_and_test_df()
+            if self.data_validation_config.sampling_mode != SAMPLING_MODE_FULL:
+                target_column = read_yaml_file(file_path=self.data_validation_config.schema_file_path)[TARGET_COLUMN_KEY]
+                sample_size = self.data_validation_config.sample_size
+                train_df = train_df.iloc[np.sort(DriftEngine.get_stratified_order(train_df, target_column)[:sample_size])]
+                test_df = test_df.iloc[np.sort(DriftEngine.get_stratified_order(test_df, target_column, 43)[:sample_size])]
+                self.data_drift_sampling = {"sampling_mode": SAMPLING_MODE_FIXED,
+                                            "reference_sample_size": len(train_df),
+                                            "current_sample_size": len(test_df)}
+            return train_df, test_df
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    @staticmethod
+    def get_evidently_report(train_df:pd.DataFrame, test_df:pd.DataFrame):
+        try:
+            #evidently is only needed for its engine or the html page
+            from evidently.report import Report
+            from evidently.metric_preset import DataDriftPreset
+            data_drift_report = Report(metrics=[DataDriftPreset()])
+            data_drift_report.run(reference_data=train_df, current_data=test_df)
+            return data_drift_report
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def get_data_drift_report(self):
+        """
+        Drift statistics are computed once, the json report and the html page are both rendered from this result
+        """
+        try:
+            if self.data_drift_report is None:
+                train_df, test_df = self.get_evidently_train_and_test_df()
+                self.data_drift_report = DataValidation.get_evidently_report(train_df=train_df, test_df=test_df)
+            return self.data_drift_report
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def get_drift_engine(self)->DriftEngine:
+        try:
+            schema = read_yaml_file(file_path=self.data_validation_config.schema_file_path)
+            return DriftEngine(categorical_columns=schema.get(CATEGORICAL_COLUMN_KEY, []),
+                                       n_bins=self.data_validation_config.drift_bins,
+                                       psi_threshold=self.data_validation_config.psi_threshold,
+                                       ks_threshold=self.data_validation_config.ks_threshold,
+                                       chi_square_p_value=self.data_validation_config.chi_square_p_value,
+                                       drift_share=self.data_validation_config.drift_share,
+                                       sampling_mode=self.data_validation_config.sampling_mode,
+                                       sample_size=self.data_validation_config.sample_size,
+                                       confidence=self.data_validation_config.confidence,
+                                       max_bound=self.data_validation_config.max_bound)
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def get_native_data_drift_report(self)->dict:
+        try:
+            schema = read_yaml_file(file_path=self.data_validation_config.schema_file_path)
+            train_df, test_df = self.get_train_and_test_df()
+            return self.get_drift_engine().calculate(reference_df=train_df, current_df=test_df,
+                                          columns=list(schema[DATASET_SCHEMA_COLUMNS_KEY]),
+                                          stratify_column=schema[TARGET_COLUMN_KEY])
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
         
     def get_and_save_data_drift_report(self):
         try:
-           profile = Profile(sections=[DataDriftProfileSection()])
-           train_df, test_df = self.get_train_and_test_df()
-           profile.calculate(train_df, test_df)
-           
-           report = json.loads(profile.json())
+           if self.data_validation_config.drift_engine == DRIFT_ENGINE_NATIVE:
+               report = self.get_native_data_drift_report()
+           else:
+               report = json.loads(self.get_data_drift_report().json())
+               if self.data_drift_sampling is not None:
+                   report["sampling"] = self.data_drift_sampling
            report_file_path = self.data_validation_config.report_file_path
            report_dir = os.path.dirname(report_file_path)
            os.makedirs(report_dir, exist_ok=True)
@@ -49,26 +131,74 @@ class DataValidation:
         except Exception as e:
             raise CreditCardException(e, sys) from e
     
-    def save_data_drift_report_page(self):
+    def save_reference_histogram(self):
+        """
+        Training data histogram of every schema column, read by the online drift monitor of the prediction app
+        """
         try:
-            dashbord = Dashboard(tabs=[DataDriftTab()])
-            train_df, test_df = self.get_train_and_test_df()
-            dashbord.calculate(train_df, test_df)
-            
-            report_page_file_path = self.data_validation_config.report_page_file_path
+            schema = read_yaml_file(file_path=self.data_validation_config.schema_file_path)
+            train_df, _ = self.get_train_and_test_df()
+            reference_histogram = self.get_drift_engine().get_reference_histogram(reference_df=train_df,
+                                                                                   columns=list(schema[DATASET_SCHEMA_COLUMNS_KEY]))
+            reference_histogram_file_path = self.data_validation_config.reference_histogram_file_path
+            os.makedirs(os.path.dirname(reference_histogram_file_path), exist_ok=True)
+            with open(reference_histogram_file_path, "w") as reference_histogram_file:
+                json.dump(reference_histogram, reference_histogram_file)
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    @staticmethod
+    def render_data_drift_report_page(report_page_file_path:str, train_df:pd.DataFrame = None,
+                                      test_df:pd.DataFrame = None, data_drift_report = None):
+        """
+        Save the evidently html page, computing the report first when none is given.
+        The page is written under a temporary name and renamed, so an existing page is always complete.
+        """
+        try:
+            if data_drift_report is None:
+                data_drift_report = DataValidation.get_evidently_report(train_df=train_df, test_df=test_df)
             report_page_dir = os.path.dirname(report_page_file_path)
             os.makedirs(report_page_dir, exist_ok=True)
-            
-            dashbord.save(report_page_file_path)
-            
+            temporary_file_path = f"{report_page_file_path}.tmp"
+            data_drift_report.save_html(temporary_file_path)
+            os.replace(temporary_file_path, report_page_file_path)
+            logging.info(f"Data drift report page saved : [{report_page_file_path}]")
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def save_data_drift_report_page(self)->str:
+        """
+        sync renders the page before returning, async starts a process rendering it and off skips it
+        return: page path when the page is already saved, None otherwise
+        """
+        try:
+            report_page_mode = self.data_validation_config.report_page_mode
+            report_page_file_path = self.data_validation_config.report_page_file_path
+            if report_page_mode == REPORT_PAGE_MODE_OFF:
+                logging.info(f"Data drift report page is turned off")
+                return None
+            if report_page_mode == REPORT_PAGE_MODE_ASYNC:
+                train_df, test_df = self.get_evidently_train_and_test_df()
+                self.report_page_process = multiprocessing.Process(target=DataValidation.render_data_drift_report_page,
+                                                                   args=(report_page_file_path, train_df, test_df),
+                                                                   name="data-drift-report-page")
+                self.report_page_process.start()
+                logging.info(f"Rendering data drift report page in background process : [{self.report_page_process.pid}]")
+                return None
+            DataValidation.render_data_drift_report_page(report_page_file_path=report_page_file_path,
+                                                         data_drift_report=self.get_data_drift_report())
+            return report_page_file_path
         except Exception as e:
-            raise CreditCardException(e, sys)
+            raise CreditCardException(e, sys) from e
     
     def is_data_drift_found(self) -> bool:
         try:
             report = self.get_and_save_data_drift_report()
-            self.save_data_drift_report_page()
-            return True
+            self.report_page_file_path = self.save_data_drift_report_page()
+            #Both engines put the dataset level decision in the first metric
+            dataset_drift = report["metrics"][0]["result"]
+            logging.info(f"Drifted columns : [{dataset_drift['number_of_drifted_columns']}/{dataset_drift['number_of_columns']}]")
+            return dataset_drift["dataset_drift"]
         except Exception as e:
             raise CreditCardException(e, sys) from e
         
@@ -89,8 +219,9 @@ class DataValidation:
                 for key, value in all_columns_with_data_type.items():
                     #Check that specific key present in the dataframe as column
                     if (key in train_df and key in test_df):
-                        #Check the datatype of the column
-                        if (train_df[key].dtypes != value or test_df[key].dtypes != value):
+                        #Check the kind of the column datatype, compact mode loads int64 columns as int8/int16 etc.
+                        expected_kind = np.dtype(value).kind
+                        if (train_df[key].dtypes.kind != expected_kind or test_df[key].dtypes.kind != expected_kind):
                             logging.info(f"The datatype of of column : {key} is not equal to either trainDataframe or test dataFrame")
                             return validation_status
                     else:
@@ -99,6 +230,19 @@ class DataValidation:
             else:
                 logging.info(f"Either train data or test data is missing some column ")
                 return validation_status
+            
+            #Value level checks, every constraint of the schema is evaluated as one mask over the rows
+            schema_constraints = SchemaConstraints(constraints=schema.get(SCHEMA_CONSTRAINTS_KEY))
+            chunk_size = self.data_validation_config.constraint_chunk_size
+            constraint_report = {"train": schema_constraints.count_violations(dataframe=train_df, chunk_size=chunk_size),
+                                 "test": schema_constraints.count_violations(dataframe=test_df, chunk_size=chunk_size)}
+            constraint_report_file_path = self.data_validation_config.constraint_report_file_path
+            os.makedirs(os.path.dirname(constraint_report_file_path), exist_ok=True)
+            with open(constraint_report_file_path, "w") as constraint_report_file:
+                json.dump(constraint_report, constraint_report_file, indent=6)
+            if constraint_report["train"]["invalid_rows"] > 0 or constraint_report["test"]["invalid_rows"] > 0:
+                logging.info(f"Train or test dataset violates the schema constraints : [{constraint_report_file_path}]")
+                return validation_status
             validation_status = True
             return validation_status 
         except Exception as e:
@@ -130,15 +274,27 @@ class DataValidation:
     def initiate_data_validation(self)->DataValidationArtifact:
         try:
             self.is_train_test_file_exist()
-            self.validate_dataset_schema()
-            self.is_data_drift_found()
+            if not self.validate_dataset_schema():
+                raise Exception(f"Train or test dataset does not match the schema : "
+                                f"[{self.data_validation_config.schema_file_path}], check the log and "
+                                f"[{self.data_validation_config.constraint_report_file_path}]")
+            is_data_drift_found = self.is_data_drift_found()
+            message = "Data validation performed successfuly"
+            if is_data_drift_found:
+                message = f"Data drift found between train and test dataset, check report : " \
+                          f"[{self.data_validation_config.report_file_path}]"
+                logging.info(message)
+                if self.data_validation_config.stop_on_data_drift:
+                    raise Exception(message)
+            self.save_reference_histogram()
             
             data_validation_artifact = DataValidationArtifact(
                 schema_file_path = self.data_validation_config.schema_file_path,
                 report_file_path = self.data_validation_config.report_file_path,
-                report_page_file_path = self.data_validation_config.report_page_file_path,
+                report_page_file_path = self.report_page_file_path,
                 is_validated = True,
-                message = "Data validation performed successfuly"
+                message = message,
+                is_data_drift_found = is_data_drift_found
             )
             return data_validation_artifact
         except Exception as e:
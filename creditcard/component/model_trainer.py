@@ -4,20 +4,41 @@ from creditcard.entity.artifact_entity import *
 from creditcard.entity.config_entity import *
 from creditcard.util.util import *
 from creditcard.entity.model_factory import *
+from creditcard.entity.fused_linear_model import FusedLinearModel
+
+import warnings
 
 class CreditCardEstimatorModel:
-    def __init__(self, preprocessing_object, trained_model_object):
+    def __init__(self, preprocessing_object, trained_model_object, fused_model=None):
         """
         TrainedModel constructor
         preprocessing_object: preprocessing_object
         trained_model_object: trained_model_object
+        fused_model: optional FusedLinearModel exported from the two objects above
         """
         self.preprocessing_object = preprocessing_object
         self.trained_model_object = trained_model_object
+        self.fused_model = fused_model
         
     def predict(self, X):
         transformed_feature = self.preprocessing_object.transform(X)
         return self.trained_model_object.predict(transformed_feature)
+
+    def predict_array(self, X:np.ndarray):
+        """
+        X: raw float array with the columns in schema all_feature_columns order
+        Uses the fused NumPy kernel when the model could be exported, otherwise the ndarray path of the
+        fitted pipeline, the ColumnTransformer only selects the same columns so it is skipped
+        """
+        fused_model = getattr(self, "fused_model", None)
+        if fused_model is not None:
+            return fused_model.predict(X)
+        _, pipeline, _ = self.preprocessing_object.transformers_[0]
+        with warnings.catch_warnings():
+            #The scaler was fitted on the DataFrame path and warns about missing feature names, other warnings still show
+            warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+            transformed_feature = pipeline.transform(X)
+        return self.trained_model_object.predict(transformed_feature)
     
     def __repr__(self):
         return f"{type(self.trained_model_object).__name__}()"
@@ -35,22 +56,22 @@ class ModelTrainer:
             raise CreditCardException(e, sys) from e
     def initiate_model_trainer(self)->ModelTrainerArtifact:
         try:
+            #Memory mapped, the grid search reads the saved arrays without materializing copies
             logging.info(f"Loading transformed training dataset")
-            transformed_train_file_path = self.data_transformation_artifact.transformed_train_file_path
-            train_array = load_numpy_array_data(transformed_train_file_path)
+            X_train = load_numpy_array_data(self.data_transformation_artifact.transformed_train_file_path, mmap_mode="r")
+            y_train = load_numpy_array_data(self.data_transformation_artifact.transformed_train_target_file_path, mmap_mode="r")
             
             logging.info(f"Loading transformed testing dataset")
-            transformed_test_file_path = self.data_transformation_artifact.transformed_test_file_path
-            test_array = load_numpy_array_data(transformed_test_file_path)
-            
-            logging.info(f"Splitting Training And Testng input's input feature and output feature")
-            X_train, y_train, X_test, y_test = train_array[:, :-1],  train_array[:, -1], test_array[:, :-1], test_array[:, -1]
+            X_test = load_numpy_array_data(self.data_transformation_artifact.transformed_test_file_path, mmap_mode="r")
+            y_test = load_numpy_array_data(self.data_transformation_artifact.transformed_test_target_file_path, mmap_mode="r")
             
             logging.info(f"Extracting model config file path")
             model_config_file_path = self.model_trainer_config.model_config_file_path
             
             logging.info(f"Initializing model factory class using above model config file: {model_config_file_path}")
-            model_factory = ModelFactory(model_config_file_path=model_config_file_path)
+            model_factory = ModelFactory(model_config_file_path=model_config_file_path,
+                                         cv_result_store_file_path=self.model_trainer_config.cv_result_store_file_path,
+                                         cv_result_store_size=self.model_trainer_config.cv_result_store_size)
             
             base_accuracy = self.model_trainer_config.base_accuracy
             logging.info(f"Expected Base Accuracy is this much : {base_accuracy}")
@@ -69,14 +90,20 @@ class ModelTrainer:
                                                                        y_train=y_train,
                                                                        X_test=X_test,
                                                                        y_test=y_test,
-                                                                       base_accuracy=base_accuracy)
+                                                                       base_accuracy=base_accuracy,
+                                                                       cv_scores=[model.best_score for model in grid_searched_best_model_list])
             logging.info(f"Best model found on the training and testing data {metric_info.model_name}")
             
             preprocessing_object = load_object(self.data_transformation_artifact.preprocessed_object_file_path)
             model_object = metric_info.model_object
             
             trained_model_file_path = self.model_trainer_config.trained_model_file_path
-            housing_model = CreditCardEstimatorModel(preprocessing_object=preprocessing_object, trained_model_object=model_object)
+            fused_model = FusedLinearModel.from_estimator(preprocessing_object=preprocessing_object,
+                                                          trained_model_object=model_object)
+            logging.info(f"Fused inference kernel exported : {fused_model is not None}")
+            housing_model = CreditCardEstimatorModel(preprocessing_object=preprocessing_object,
+                                                     trained_model_object=model_object,
+                                                     fused_model=fused_model)
             logging.info(f"Saving model at path: {trained_model_file_path}")
             save_object(file_path=trained_model_file_path, obj=housing_model)
             
@@ -88,7 +115,9 @@ class ModelTrainer:
                                                           recall= metric_info.recall,
                                                           precession= metric_info.precession,
                                                           f1_score =  metric_info.f1_score,
-                                                          model_accuracy=metric_info.model_accuracy)
+                                                          model_accuracy=metric_info.model_accuracy,
+                                                          roc_auc=metric_info.roc_auc,
+                                                          log_loss=metric_info.log_loss)
             return model_trainer_artifact
         except Exception as e:
             raise CreditCardException(e, sys) from e
@@ -42,13 +42,29 @@ class Configuration:
                 data_ingestion_artifact_dir,
                 data_ingestion_info[DATA_INGESTION_TEST_DIR_KEY]
             )
+            split_chunk_size = data_ingestion_info[DATA_INGESTION_SPLIT_CHUNK_SIZE_KEY]
+            reuse_ingested_data = data_ingestion_info[DATA_INGESTION_REUSE_INGESTED_DATA_KEY]
+            ingestion_index_file_path = os.path.join(
+                artifact_dir,
+                DATA_INGESTION_ARTIFACT_DIR,
+                DATA_INGESTION_INDEX_FILE_NAME
+            )
+            ingested_data_format = data_ingestion_info[DATA_INGESTION_DATA_FORMAT_KEY]
+            max_workers = data_ingestion_info[DATA_INGESTION_MAX_WORKERS_KEY]
+            schema_file_path = self.get_data_validation_config().schema_file_path
 
             data_ingestion_config = DataIngestionConfig(
                 training_file_name = training_file_name,
                 training_file_path = training_file_path,
                 raw_data_dir = raw_data_dir,
                 ingested_train_dir = ingested_train_dir,
-                ingested_test_dir = ingested_test_dir
+                ingested_test_dir = ingested_test_dir,
+                split_chunk_size = split_chunk_size,
+                reuse_ingested_data = reuse_ingested_data,
+                ingestion_index_file_path = ingestion_index_file_path,
+                ingested_data_format = ingested_data_format,
+                schema_file_path = schema_file_path,
+                max_workers = max_workers
             )
             logging.info(f"Data ingestion Config : {data_ingestion_config}")
             return data_ingestion_config
@@ -73,9 +89,32 @@ class Configuration:
                                             data_validation_config[DATA_VALIDATION_REPORT_FILE_NAME_KEY])
             report_page_file_path = os.path.join(data_validation_artifact_dir,
                                                  data_validation_config[DATA_VALIDATION_REPORT_PAGE_FILE_NAME_KEY])
+            constraint_report_file_path = os.path.join(data_validation_artifact_dir,
+                                                       data_validation_config[DATA_VALIDATION_CONSTRAINT_REPORT_FILE_NAME_KEY])
+            reference_histogram_file_path = os.path.join(data_validation_artifact_dir,
+                                                         data_validation_config[DATA_VALIDATION_REFERENCE_HISTOGRAM_FILE_NAME_KEY])
+            #yaml reads an unquoted off as False
+            report_page_mode = data_validation_config[DATA_VALIDATION_REPORT_PAGE_MODE_KEY]
+            if report_page_mode is False:
+                report_page_mode = REPORT_PAGE_MODE_OFF
             data_validation_config = DataValidationConfig(schema_file_path = schema_file_path,
                                                           report_file_path = report_file_path,
-                                                          report_page_file_path = report_page_file_path)
+                                                          report_page_file_path = report_page_file_path,
+                                                          report_page_mode = report_page_mode,
+                                                          constraint_report_file_path = constraint_report_file_path,
+                                                          constraint_chunk_size = data_validation_config[DATA_VALIDATION_CONSTRAINT_CHUNK_SIZE_KEY],
+                                                          reference_histogram_file_path = reference_histogram_file_path,
+                                                          drift_engine = data_validation_config[DATA_VALIDATION_DRIFT_ENGINE_KEY],
+                                                          drift_bins = data_validation_config[DATA_VALIDATION_DRIFT_BINS_KEY],
+                                                          psi_threshold = data_validation_config[DATA_VALIDATION_PSI_THRESHOLD_KEY],
+                                                          ks_threshold = data_validation_config[DATA_VALIDATION_KS_THRESHOLD_KEY],
+                                                          chi_square_p_value = data_validation_config[DATA_VALIDATION_CHI_SQUARE_P_VALUE_KEY],
+                                                          drift_share = data_validation_config[DATA_VALIDATION_DRIFT_SHARE_KEY],
+                                                          sampling_mode = data_validation_config[DATA_VALIDATION_SAMPLING_MODE_KEY],
+                                                          sample_size = data_validation_config[DATA_VALIDATION_SAMPLE_SIZE_KEY],
+                                                          confidence = data_validation_config[DATA_VALIDATION_CONFIDENCE_KEY],
+                                                          max_bound = data_validation_config[DATA_VALIDATION_MAX_BOUND_KEY],
+                                                          stop_on_data_drift = data_validation_config[DATA_VALIDATION_STOP_ON_DATA_DRIFT_KEY])
             logging.info(f"Data validation config: {data_validation_config}")
             return data_validation_config
         except Exception as e:
@@ -104,10 +143,20 @@ class Configuration:
             preprocessed_object_file_path = os.path.join(data_transformation_artifact_dir,
                                                          data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSING_DIR_KEY],
                                                          data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSED_FILE_NAME_KEY])
+            #Shared by all runs, so the cache lives next to the timestamped folders
+            transformation_cache_dir = os.path.join(artifact_dir,
+                                                    DATA_TRANSFORMATION_ARTIFACT_DIR,
+                                                    data_transformation_config_info[DATA_TRANSFORMATION_CACHE_DIR_KEY])
             data_transformation_config = DataTransformationConfig(add_bedroom_per_room = add_bedroom_per_room,
                                                                   transformed_train_dir = transformed_train_dir,
                                                                   transformed_test_dir = transformed_test_dir,
-                                                                  preprocessed_object_file_path= preprocessed_object_file_path)
+                                                                  preprocessed_object_file_path= preprocessed_object_file_path,
+                                                                  transformed_dtype= data_transformation_config_info[DATA_TRANSFORMATION_TRANSFORMED_DTYPE_KEY],
+                                                                  transform_chunk_size= data_transformation_config_info[DATA_TRANSFORMATION_TRANSFORM_CHUNK_SIZE_KEY],
+                                                                  lambda_sample_size= data_transformation_config_info[DATA_TRANSFORMATION_LAMBDA_SAMPLE_SIZE_KEY],
+                                                                  max_workers= data_transformation_config_info[DATA_TRANSFORMATION_MAX_WORKERS_KEY],
+                                                                  transformation_cache_dir= transformation_cache_dir,
+                                                                  transformation_cache_size= data_transformation_config_info[DATA_TRANSFORMATION_CACHE_SIZE_KEY])
             logging.info(f"Data transformation config: {data_transformation_config}")
             return data_transformation_config
         except Exception as e:
@@ -132,9 +181,16 @@ class Configuration:
                                                  model_trainer_config_info[MODEL_TRAINER_MODEL_CONFIG_DIR_KEY],
                                                  model_trainer_config_info[MODEL_TRAINER_MODEL_CONFIG_FILE_NAME_KEY])
             
+            #Shared by all runs, so the store lives next to the timestamped folders
+            cv_result_store_file_path = os.path.join(artifact_dir,
+                                                     MODEL_TRAINER_ARTIFACT_DIR,
+                                                     model_trainer_config_info[MODEL_TRAINER_CV_RESULT_STORE_FILE_NAME_KEY])
+            
             model_trainer_config = ModelTrainerConfig(trained_model_file_path=trained_model_file_path,
                                                       base_accuracy=bas_accuracy,
-                                                      model_config_file_path=model_config_file_path)
+                                                      model_config_file_path=model_config_file_path,
+                                                      cv_result_store_file_path=cv_result_store_file_path,
+                                                      cv_result_store_size=model_trainer_config_info[MODEL_TRAINER_CV_RESULT_STORE_SIZE_KEY])
             logging.info(f"Model trainer config: {model_trainer_config}")
             return model_trainer_config
         except Exception as e:
@@ -173,6 +229,37 @@ class Configuration:
         except Exception as e:
             raise CreditCardException(e, sys) from e
     
+    def get_prediction_config(self)->PredictionConfig:
+        try:
+            prediction_config_info = self.config_info[PREDICTION_CONFIG_KEY]
+            model_dir = os.path.join(ROOT_DIR, prediction_config_info[PREDICTION_MODEL_DIR_KEY])
+            model_file_name = prediction_config_info[PREDICTION_MODEL_FILE_NAME_KEY]
+            data_validation_config = self.get_data_validation_config()
+            schema_file_path = data_validation_config.schema_file_path
+            batch_window_ms = prediction_config_info[PREDICTION_BATCH_WINDOW_MS_KEY]
+            max_batch_size = prediction_config_info[PREDICTION_MAX_BATCH_SIZE_KEY]
+            #Reference histograms are saved in every validation run folder, the monitor picks the latest one
+            reference_histogram_dir = os.path.join(self.training_pipeline_config.artifact_dir,
+                                                   DATA_VALIDATION_ARTIFACT_DIR_NAME)
+            reference_histogram_file_name = os.path.basename(data_validation_config.reference_histogram_file_path)
+            drift_monitor_dir = os.path.join(ROOT_DIR, prediction_config_info[PREDICTION_DRIFT_MONITOR_DIR_KEY])
+            drift_flush_interval_s = prediction_config_info[PREDICTION_DRIFT_FLUSH_INTERVAL_KEY]
+            prediction_config = PredictionConfig(model_dir=model_dir,
+                                                 model_file_name=model_file_name,
+                                                 schema_file_path=schema_file_path,
+                                                 batch_window_ms=batch_window_ms,
+                                                 max_batch_size=max_batch_size,
+                                                 reference_histogram_dir=reference_histogram_dir,
+                                                 reference_histogram_file_name=reference_histogram_file_name,
+                                                 drift_monitor_dir=drift_monitor_dir,
+                                                 drift_flush_interval_s=drift_flush_interval_s,
+                                                 psi_threshold=data_validation_config.psi_threshold,
+                                                 drift_share=data_validation_config.drift_share)
+            logging.info(f"Prediction config: {prediction_config}")
+            return prediction_config
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
     def get_training_pipline_config(self) -> TrainingPipelineConfig:
         try:
             training_pipeline_config = self.config_info[TRAINING_PIPELINE_CONFIG_KEY]
@@ -23,6 +23,17 @@ DATA_INGESTION_TRAINING_FILE_PATH = "training_file_path"
 DATA_INGESTION_INGESTED_DIR_NAME_KEY = "ingested_dir"
 DATA_INGESTION_TRAIN_DIR_KEY = "ingested_train_dir"
 DATA_INGESTION_TEST_DIR_KEY = "ingested_test_dir"
+DATA_INGESTION_SPLIT_CHUNK_SIZE_KEY = "split_chunk_size"
+DATA_INGESTION_REUSE_INGESTED_DATA_KEY = "reuse_ingested_data"
+DATA_INGESTION_INDEX_FILE_NAME = "ingestion_index.yaml"
+DATA_INGESTION_DATA_FORMAT_KEY = "ingested_data_format"
+DATA_INGESTION_MAX_WORKERS_KEY = "max_workers"
+DATA_INGESTION_COMBINED_FILE_NAME = "creditcard.csv"
+DATA_FORMAT_CSV = "csv"
+DATA_FORMAT_COLUMNAR = "npy"
+COLUMNAR_FILE_EXTENSION = ".npy"
+COLUMNAR_META_FILE_NAME = "columns.yaml"
+COLUMNAR_MASK_FILE_SUFFIX = ".mask"
 
 # Data Validation related variables
 DATA_VALIDATION_CONFIG_KEY = "data_validation_config"
@@ -31,6 +42,26 @@ DATA_VALIDATION_SCHEMA_DIR_KEY = "schema_dir"
 DATA_VALIDATION_ARTIFACT_DIR_NAME = "data_validation"
 DATA_VALIDATION_REPORT_FILE_NAME_KEY = "report_file_name"
 DATA_VALIDATION_REPORT_PAGE_FILE_NAME_KEY = "report_page_file_name"
+DATA_VALIDATION_REPORT_PAGE_MODE_KEY = "report_page_mode"
+REPORT_PAGE_MODE_SYNC = "sync"
+REPORT_PAGE_MODE_ASYNC = "async"
+REPORT_PAGE_MODE_OFF = "off"
+DATA_VALIDATION_CONSTRAINT_REPORT_FILE_NAME_KEY = "constraint_report_file_name"
+DATA_VALIDATION_CONSTRAINT_CHUNK_SIZE_KEY = "constraint_chunk_size"
+DATA_VALIDATION_REFERENCE_HISTOGRAM_FILE_NAME_KEY = "reference_histogram_file_name"
+DATA_VALIDATION_DRIFT_ENGINE_KEY = "drift_engine"
+DATA_VALIDATION_DRIFT_BINS_KEY = "drift_bins"
+DATA_VALIDATION_PSI_THRESHOLD_KEY = "psi_threshold"
+DATA_VALIDATION_KS_THRESHOLD_KEY = "ks_threshold"
+DATA_VALIDATION_CHI_SQUARE_P_VALUE_KEY = "chi_square_p_value"
+DATA_VALIDATION_DRIFT_SHARE_KEY = "drift_share"
+DATA_VALIDATION_SAMPLING_MODE_KEY = "sampling_mode"
+DATA_VALIDATION_SAMPLE_SIZE_KEY = "sample_size"
+DATA_VALIDATION_CONFIDENCE_KEY = "confidence"
+DATA_VALIDATION_MAX_BOUND_KEY = "max_bound"
+DATA_VALIDATION_STOP_ON_DATA_DRIFT_KEY = "stop_on_data_drift"
+DRIFT_ENGINE_NATIVE = "native"
+DRIFT_ENGINE_EVIDENTLY = "evidently"
 
 #Data Transformation related Variable
 DATA_TRANSFORMATION_ARTIFACT_DIR = "data_transformation"
@@ -41,6 +72,14 @@ DATA_TRANSFORMATION_TRAIN_DIR_NAME_KEY = "transformed_train_dir"
 DATA_TRANSFORMATION_TEST_DIR_NAME_KEY = "transformed_test_dir"
 DATA_TRANSFORMATION_PREPROCESSING_DIR_KEY = "preprocessing_dir"
 DATA_TRANSFORMATION_PREPROCESSED_FILE_NAME_KEY = "preprocessed_object_file_name"
+DATA_TRANSFORMATION_TRANSFORMED_DTYPE_KEY = "transformed_dtype"
+DATA_TRANSFORMATION_TRANSFORM_CHUNK_SIZE_KEY = "transform_chunk_size"
+DATA_TRANSFORMATION_LAMBDA_SAMPLE_SIZE_KEY = "lambda_sample_size"
+DATA_TRANSFORMATION_MAX_WORKERS_KEY = "max_workers"
+DATA_TRANSFORMATION_CACHE_DIR_KEY = "transformation_cache_dir"
+DATA_TRANSFORMATION_CACHE_SIZE_KEY = "transformation_cache_size"
+TRANSFORMED_INPUT_FILE_SUFFIX = "_input.npy"
+TRANSFORMED_TARGET_FILE_SUFFIX = "_target.npy"
 
 COLUMN_TOTAL_ROOMS = "total_rooms"
 COLUMN_POPULATION = "population"
@@ -51,6 +90,8 @@ DATASET_SCHEMA_COLUMNS_KEY=  "columns"
 NUMERICAL_COLUMN_KEY="numerical_columns"
 CATEGORICAL_COLUMN_KEY = "categorical_columns"
 TARGET_COLUMN_KEY="target_column"
+SCHEMA_COMPACT_DTYPES_KEY = "compact_dtypes"
+SCHEMA_CONSTRAINTS_KEY = "constraints"
 COLUMN_TO_BE_DROPED = "column_to_be_droped"
 COLUMN_NEEDS_TO_REPLACE_VALUE = "column_needs_to_replace_value"
 ALL_FEATURE_COLUMNS = "all_feature_columns"
@@ -64,6 +105,8 @@ MODEL_TRAINER_TRAINED_MODEL_FILE_NAME_KEY = "model_file_name"
 MODEL_TRAINER_BASE_ACCURACY_KEY = "base_accuracy"
 MODEL_TRAINER_MODEL_CONFIG_DIR_KEY = "model_config_dir"
 MODEL_TRAINER_MODEL_CONFIG_FILE_NAME_KEY = "model_config_file_name"
+MODEL_TRAINER_CV_RESULT_STORE_FILE_NAME_KEY = "cv_result_store_file_name"
+MODEL_TRAINER_CV_RESULT_STORE_SIZE_KEY = "cv_result_store_size"
 
 #Model Evaluation Config Key
 MODEL_EVALUATION_CONFIG_KEY = "model_evaluation_config"
@@ -74,6 +117,15 @@ MODEL_EVALUATION_ARTIFACT_DIR = "model_evaluation"
 MODEL_PUSHER_CONFIG_KEY = "model_pusher_config"
 MODEL_PUSHER_MODEL_EXPORT_DIR_KEY = "model_export_dir"
 
+# Prediction config key
+PREDICTION_CONFIG_KEY = "prediction_config"
+PREDICTION_MODEL_DIR_KEY = "model_dir"
+PREDICTION_MODEL_FILE_NAME_KEY = "model_file_name"
+PREDICTION_BATCH_WINDOW_MS_KEY = "batch_window_ms"
+PREDICTION_MAX_BATCH_SIZE_KEY = "max_batch_size"
+PREDICTION_DRIFT_MONITOR_DIR_KEY = "drift_monitor_dir"
+PREDICTION_DRIFT_FLUSH_INTERVAL_KEY = "drift_flush_interval_s"
+
 
 BEST_MODEL_KEY = "best_model"
 HISTORY_KEY = "history"
@@ -5,15 +5,15 @@ DataIngestionArtifact = namedtuple("DataIngestionArtifact",
 [ "train_file_path", "test_file_path", "is_ingested", "message"]) 
 
 DataValidationArtifact = namedtuple("DataValidationArtifact",
-["schema_file_path", "report_file_path", "report_page_file_path", "is_validated", "message"])
+["schema_file_path", "report_file_path", "report_page_file_path", "is_validated", "message", "is_data_drift_found"])
 
 DataTransformationArtifact = namedtuple("DataTransformationArtifact",
  ["is_transformed", "message", "transformed_train_file_path","transformed_test_file_path",
-     "preprocessed_object_file_path"])
+     "preprocessed_object_file_path", "transformed_train_target_file_path", "transformed_test_target_file_path"])
 
 ModelTrainerArtifact = namedtuple("ModelTrainerArtifact", ["is_trained", "message", "trained_model_file_path",
                                                         "train_accuracy", "test_accuracy","recall", "precession", "f1_score",
-                                                           "model_accuracy"])
+                                                           "model_accuracy", "roc_auc", "log_loss"])
 
 
 ModelEvaluationArtifact = namedtuple("ModelEvaluationArtifact", ["is_model_accepted", "evaluated_model_path"])
@@ -2,22 +2,40 @@ from collections import namedtuple
 
 
 DataIngestionConfig=namedtuple("DataIngestionConfig",
-["training_file_path","training_file_name","raw_data_dir","ingested_train_dir","ingested_test_dir"])
+["training_file_path","training_file_name","raw_data_dir","ingested_train_dir","ingested_test_dir",
+ "split_chunk_size","reuse_ingested_data","ingestion_index_file_path","ingested_data_format","schema_file_path",
+ "max_workers"])
 
 
-DataValidationConfig = namedtuple("DataValidationConfig", ["schema_file_path", "report_file_path", "report_page_file_path"])
+DataValidationConfig = namedtuple("DataValidationConfig", ["schema_file_path", "report_file_path", "report_page_file_path",
+                                                           "report_page_mode", "constraint_report_file_path", "constraint_chunk_size",
+                                                           "reference_histogram_file_path", "drift_engine", "drift_bins", "psi_threshold", "ks_threshold",
+                                                           "chi_square_p_value", "drift_share", "sampling_mode",
+                                                           "sample_size", "confidence", "max_bound", "stop_on_data_drift"])
 
 DataTransformationConfig = namedtuple("DataTransformationConfig", ["add_bedroom_per_room",
                                                                    "transformed_train_dir",
                                                                    "transformed_test_dir",
-                                                                   "preprocessed_object_file_path"])
+                                                                   "preprocessed_object_file_path",
+                                                                   "transformed_dtype",
+                                                                   "transform_chunk_size",
+                                                                   "lambda_sample_size",
+                                                                   "max_workers",
+                                                                   "transformation_cache_dir",
+                                                                   "transformation_cache_size"])
 
 
-ModelTrainerConfig = namedtuple("ModelTrainerConfig", ["trained_model_file_path", "base_accuracy", "model_config_file_path"])
+ModelTrainerConfig = namedtuple("ModelTrainerConfig", ["trained_model_file_path", "base_accuracy", "model_config_file_path",
+                                                       "cv_result_store_file_path", "cv_result_store_size"])
 
 ModelEvaluationConfig = namedtuple("ModelEvaluationConfig", ["model_evaluation_file_path","time_stamp"])
 
 
 ModelPusherConfig = namedtuple("ModelPusherConfig", ["export_dir_path"])
 
+PredictionConfig = namedtuple("PredictionConfig", ["model_dir", "model_file_name", "schema_file_path",
+                                                       "batch_window_ms", "max_batch_size", "reference_histogram_dir",
+                                                       "reference_histogram_file_name", "drift_monitor_dir",
+                                                       "drift_flush_interval_s", "psi_threshold", "drift_share"])
+
 TrainingPipelineConfig = namedtuple("TrainingPipelineConfig", ["artifact_dir"])
\ No newline at end of file
@@ -0,0 +1,132 @@
+from creditcard.exception import CreditCardException
+from creditcard.logger import logging
+from creditcard.constants import *
+from creditcard.util.util import *
+
+import os, sys
+import numpy as np
+
+
+class InvalidRecordError(ValueError):
+    """
+    Client side error of a prediction request, the record does not match the schema feature columns
+    """
+    pass
+
+
+class CreditCardPredictor:
+    def __init__(self, model_dir:str, model_file_name:str, schema_file_path:str, drift_monitor=None):
+        """
+        CreditCardPredictor constructor
+        model_dir: directory holding one timestamped folder per training run
+        model_file_name: name of the pickled CreditCardEstimatorModel inside a run folder
+        schema_file_path: schema used to order the incoming feature columns
+        drift_monitor: optional DriftMonitor fed with every scored batch
+        """
+        try:
+            self.model_dir = model_dir
+            self.model_file_name = model_file_name
+            dataset_schema = read_yaml_file(file_path=schema_file_path)
+            self.feature_columns = dataset_schema[ALL_FEATURE_COLUMNS]
+            self.model = None
+            self.model_path = None
+            self.drift_monitor = drift_monitor
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def get_latest_model_path(self)->str:
+        """
+        Timestamped run folders sort lexicographically, so the last one is the latest run.
+        return: path of the model file inside the latest run folder
+        """
+        try:
+            run_folders = sorted(os.listdir(self.model_dir))
+            if len(run_folders) == 0:
+                raise Exception(f"No trained model found in : [{self.model_dir}]")
+            latest_run_dir = os.path.join(self.model_dir, run_folders[-1])
+            for dir_path, _, file_names in os.walk(latest_run_dir):
+                if self.model_file_name in file_names:
+                    return os.path.join(dir_path, self.model_file_name)
+            raise Exception(f"Model file : [{self.model_file_name}] is not present in : [{latest_run_dir}]")
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def load_model(self):
+        """
+        Unpickle the latest model only once, every later call reuses the loaded object.
+        """
+        try:
+            if self.model is None:
+                self.model_path = self.get_latest_model_path()
+                logging.info(f"Loading model from : [{self.model_path}]")
+                self.model = load_object(file_path=self.model_path)
+            return self.model
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def get_record_row(self, record)->list:
+        """
+        Validate one record and convert it to exactly one row of floats in schema column order.
+        record: dict keyed by column name or list of values in schema column order
+        raise: InvalidRecordError naming what does not match the schema
+        """
+        if isinstance(record, dict):
+            missing_columns = [column for column in self.feature_columns if column not in record]
+            if len(missing_columns) > 0:
+                raise InvalidRecordError(f"Record is missing columns : {missing_columns}")
+            values = [record[column] for column in self.feature_columns]
+        elif isinstance(record, list):
+            if len(record) != len(self.feature_columns):
+                raise InvalidRecordError(f"Record has [{len(record)}] values, expected [{len(self.feature_columns)}] "
+                                         f"in the order {self.feature_columns}")
+            values = record
+        else:
+            raise InvalidRecordError(f"Record must be an object keyed by column name or a list of values, "
+                                     f"got [{type(record).__name__}]")
+        try:
+            return [float(value) for value in values]
+        except (TypeError, ValueError) as e:
+            raise InvalidRecordError(f"Record has a non numeric value : {e}") from e
+
+    def get_input_array(self, records:list)->np.ndarray:
+        """
+        Build one raw float array for the whole batch without going through pandas, every record
+        is validated and becomes exactly one row.
+        records: list of dict keyed by column name or list of list in schema column order
+        raise: InvalidRecordError with the position of the first invalid record
+        """
+        try:
+            rows = []
+            for position, record in enumerate(records):
+                if isinstance(record, dict) != isinstance(records[0], dict):
+                    raise InvalidRecordError(f"Invalid record at position [{position}] : records of one batch must all be "
+                                             f"objects keyed by column name or all lists of values")
+                try:
+                    rows.append(self.get_record_row(record))
+                except InvalidRecordError as e:
+                    raise InvalidRecordError(f"Invalid record at position [{position}] : {e}") from e
+            input_array = np.array(rows, dtype=np.float64).reshape(len(rows), len(self.feature_columns))
+            if input_array.shape != (len(records), len(self.feature_columns)):
+                raise InvalidRecordError(f"Expected input of shape {(len(records), len(self.feature_columns))}, "
+                                         f"got {input_array.shape}")
+            return input_array
+        except InvalidRecordError:
+            raise
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def predict(self, records:list)->list:
+        """
+        return: one prediction per record
+        raise: InvalidRecordError for a record that does not match the schema, CreditCardException otherwise
+        """
+        try:
+            model = self.load_model()
+            input_array = self.get_input_array(records=records)
+            if self.drift_monitor is not None:
+                self.drift_monitor.update(input_array)
+            return model.predict_array(input_array).astype(int).tolist()
+        except InvalidRecordError:
+            raise
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
@@ -0,0 +1,99 @@
+from creditcard.exception import CreditCardException
+from creditcard.logger import logging
+
+from contextlib import closing
+import numpy as np
+import hashlib
+import sqlite3
+import time
+import sys, os
+
+#Rows hashed per step when fingerprinting the training data
+FINGERPRINT_BLOCK_SIZE = 65536
+
+
+class CVResultStore:
+    def __init__(self, store_file_path:str, max_entries:int = 100000):
+        """
+        On disk store of cross validation fold results shared by all training runs.
+        Every entry is the score and fit time of one (data, estimator, parameters, fold, scoring)
+        combination, entries beyond max_entries are evicted least recently used first.
+        """
+        try:
+            self.store_file_path = store_file_path
+            self.max_entries = max_entries
+            os.makedirs(os.path.dirname(store_file_path), exist_ok=True)
+            with closing(self.connect()) as connection, connection:
+                connection.execute("CREATE TABLE IF NOT EXISTS cv_result ("
+                                   "key TEXT PRIMARY KEY, score REAL, fit_time REAL, last_used REAL)")
+                connection.execute("CREATE INDEX IF NOT EXISTS cv_result_last_used ON cv_result (last_used)")
+                #A lowered max_entries applies right away
+                self.evict(connection=connection)
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def connect(self)->sqlite3.Connection:
+        #Concurrent training runs wait for each other's writes instead of failing
+        return sqlite3.connect(self.store_file_path, timeout=60)
+
+    @staticmethod
+    def get_data_fingerprint(*arrays)->str:
+        """
+        sha256 over shape, dtype and content of the arrays, hashed block by block so a memory
+        mapped array is never materialized at once
+        """
+        try:
+            data_hash = hashlib.sha256()
+            for array in arrays:
+                data_hash.update(f"{array.shape}:{array.dtype}\n".encode())
+                for start in range(0, len(array), FINGERPRINT_BLOCK_SIZE):
+                    data_hash.update(np.ascontiguousarray(array[start:start + FINGERPRINT_BLOCK_SIZE]).tobytes())
+            return data_hash.hexdigest()
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    @staticmethod
+    def get_key(*key_parts)->str:
+        return hashlib.sha256("\n".join(str(key_part) for key_part in key_parts).encode()).hexdigest()
+
+    def get_results(self, keys:list)->dict:
+        """
+        return: key -> (score, fit time) of the stored keys, their last use is refreshed
+        """
+        try:
+            results = {}
+            with closing(self.connect()) as connection, connection:
+                #sqlite limits the number of bound parameters of one statement
+                for start in range(0, len(keys), 500):
+                    key_block = keys[start:start + 500]
+                    rows = connection.execute(f"SELECT key, score, fit_time FROM cv_result WHERE key IN "
+                                              f"({','.join('?' * len(key_block))})", key_block).fetchall()
+                    results.update({key: (score, fit_time) for key, score, fit_time in rows})
+                connection.executemany("UPDATE cv_result SET last_used = ? WHERE key = ?",
+                                       [(time.time(), key) for key in results])
+            return results
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def save_results(self, results:dict):
+        """
+        results: key -> (score, fit time)
+        """
+        try:
+            now = time.time()
+            with closing(self.connect()) as connection, connection:
+                connection.executemany("INSERT OR REPLACE INTO cv_result (key, score, fit_time, last_used) VALUES (?, ?, ?, ?)",
+                                       [(key, float(score), float(fit_time), now) for key, (score, fit_time) in results.items()])
+                self.evict(connection=connection)
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def evict(self, connection:sqlite3.Connection):
+        """
+        Delete the least recently used results beyond max_entries
+        """
+        number_of_entries = connection.execute("SELECT COUNT(*) FROM cv_result").fetchone()[0]
+        if number_of_entries > self.max_entries:
+            logging.info(f"Evicting [{number_of_entries - self.max_entries}] least recently used CV results")
+            connection.execute("DELETE FROM cv_result WHERE key IN (SELECT key FROM cv_result "
+                               "ORDER BY last_used LIMIT ?)", (number_of_entries - self.max_entries,))
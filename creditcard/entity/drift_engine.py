@@ -0,0 +1,333 @@
+from creditcard.exception import CreditCardException
+from creditcard.logger import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import scipy.stats as stat
+import scipy.optimize as optimize
+import pandas as pd
+import numpy as np
+import sys
+
+NUMERICAL_COLUMN_TYPE = "num"
+CATEGORICAL_COLUMN_TYPE = "cat"
+#Share floor so that an empty bin does not make the PSI infinite
+PSI_EPSILON = 1e-4
+SAMPLING_MODE_FULL = "full"
+SAMPLING_MODE_FIXED = "fixed"
+SAMPLING_MODE_PROGRESSIVE = "progressive"
+
+
+class DriftEngine:
+    def __init__(self, categorical_columns:list = None, n_bins:int = 10, psi_threshold:float = 0.2,
+                 ks_threshold:float = 0.1, chi_square_p_value:float = 0.05, drift_share:float = 0.5,
+                 max_workers:int = None, sampling_mode:str = SAMPLING_MODE_FULL, sample_size:int = 50000,
+                 confidence:float = 0.95, max_bound:float = 0.01, random_state:int = 42):
+        """
+        Per column drift between a reference and a current dataset.
+        Numerical columns: PSI over reference quantile bins and the two sample KS statistic.
+        Categorical columns: PSI and chi-square test over the union of categories, the KS statistic
+        over the category order is only reported, it backs the sampling bounds.
+        A column drifts when any of its statistics crosses its threshold, the dataset drifts
+        when the share of drifted columns reaches drift_share.
+        sampling_mode: full scans every row, fixed uses one stratified sample of sample_size rows,
+        progressive doubles the sample from sample_size until every column's decision is settled, the KS
+        confidence interval of numerical columns no longer straddles ks_threshold (or is narrower than max_bound)
+        and the chi-square test of categorical columns decides the same on the sample and projected to the full datasets
+        """
+        try:
+            self.categorical_columns = list(categorical_columns or [])
+            self.n_bins = n_bins
+            self.psi_threshold = psi_threshold
+            self.ks_threshold = ks_threshold
+            self.chi_square_p_value = chi_square_p_value
+            self.drift_share = drift_share
+            self.max_workers = max_workers
+            self.sampling_mode = sampling_mode
+            self.sample_size = sample_size
+            self.confidence = confidence
+            self.max_bound = max_bound
+            self.random_state = random_state
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    @staticmethod
+    def get_column_values(dataframe:pd.DataFrame, column:str)->np.ndarray:
+        column_value = dataframe[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        return column_value[~np.isnan(column_value)]
+
+    @staticmethod
+    def get_population_stability_index(reference_count:np.ndarray, current_count:np.ndarray)->float:
+        reference_share = np.maximum(reference_count / max(reference_count.sum(), 1), PSI_EPSILON)
+        current_share = np.maximum(current_count / max(current_count.sum(), 1), PSI_EPSILON)
+        return float(np.sum((current_share - reference_share) * np.log(current_share / reference_share)))
+
+    @staticmethod
+    def get_ks_statistic(reference_sorted:np.ndarray, current_sorted:np.ndarray)->float:
+        """
+        Largest gap between the two empirical CDFs, both evaluated at every observed value
+        """
+        if len(reference_sorted) == 0 or len(current_sorted) == 0:
+            return 0.0
+        all_values = np.concatenate([reference_sorted, current_sorted])
+        reference_cdf = np.searchsorted(reference_sorted, all_values, side="right") / len(reference_sorted)
+        current_cdf = np.searchsorted(current_sorted, all_values, side="right") / len(current_sorted)
+        return float(np.max(np.abs(reference_cdf - current_cdf)))
+
+    @staticmethod
+    def get_chi_square_test(reference_count:np.ndarray, current_count:np.ndarray):
+        """
+        Chi-square test of homogeneity on the 2 x k contingency table
+        return: (statistic, p_value)
+        """
+        observed = np.vstack([reference_count, current_count]).astype(np.float64)
+        observed = observed[:, observed.sum(axis=0) > 0]
+        degree_of_freedom = observed.shape[1] - 1
+        if degree_of_freedom <= 0 or observed.sum(axis=1).min() == 0:
+            return 0.0, 1.0
+        expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / observed.sum()
+        statistic = float(np.sum((observed - expected) ** 2 / expected))
+        return statistic, float(stat.chi2.sf(statistic, degree_of_freedom))
+
+    def get_numerical_histogram(self, reference_sorted:np.ndarray, current_value:np.ndarray):
+        """
+        Bin edges are the reference quantiles, so every reference bin holds about the same share
+        return: (bin edges, reference count, current count)
+        """
+        if len(reference_sorted) == 0:
+            bin_edges = np.array([0.0, 0.0])
+        else:
+            bin_edges = np.unique(np.quantile(reference_sorted, np.linspace(0, 1, self.n_bins + 1)))
+        inner_edges = bin_edges[1:-1]
+        minlength = len(inner_edges) + 1
+        reference_count = np.bincount(np.searchsorted(inner_edges, reference_sorted, side="right"), minlength=minlength)
+        current_count = np.bincount(np.searchsorted(inner_edges, current_value, side="right"), minlength=minlength)
+        return bin_edges, reference_count, current_count
+
+    @staticmethod
+    def get_categorical_histogram(reference_value:np.ndarray, current_value:np.ndarray):
+        """
+        return: (categories, reference count, current count)
+        """
+        categories = np.unique(np.concatenate([reference_value, current_value]))
+        reference_count = np.bincount(np.searchsorted(categories, reference_value), minlength=len(categories))
+        current_count = np.bincount(np.searchsorted(categories, current_value), minlength=len(categories))
+        return categories, reference_count, current_count
+
+    def get_column_drift(self, column:str, reference_df:pd.DataFrame, current_df:pd.DataFrame)->dict:
+        try:
+            reference_value = DriftEngine.get_column_values(reference_df, column)
+            current_value = DriftEngine.get_column_values(current_df, column)
+            column_drift = {"column_name": column,
+                            "stattest_name": "PSI",
+                            "stattest_threshold": self.psi_threshold}
+            if column in self.categorical_columns:
+                bins, reference_count, current_count = DriftEngine.get_categorical_histogram(reference_value, current_value)
+                reference_value.sort()
+                current_value.sort()
+                column_drift["ks_statistic"] = DriftEngine.get_ks_statistic(reference_value, current_value)
+                chi_square_statistic, chi_square_p_value = DriftEngine.get_chi_square_test(reference_count, current_count)
+                column_drift["column_type"] = CATEGORICAL_COLUMN_TYPE
+                column_drift["chi_square_statistic"] = chi_square_statistic
+                column_drift["chi_square_p_value"] = chi_square_p_value
+                is_test_drift = chi_square_p_value < self.chi_square_p_value
+            else:
+                reference_value.sort()
+                current_value.sort()
+                bins, reference_count, current_count = self.get_numerical_histogram(reference_value, current_value)
+                ks_statistic = DriftEngine.get_ks_statistic(reference_value, current_value)
+                column_drift["column_type"] = NUMERICAL_COLUMN_TYPE
+                column_drift["ks_statistic"] = ks_statistic
+                is_test_drift = ks_statistic >= self.ks_threshold
+            psi = DriftEngine.get_population_stability_index(reference_count, current_count)
+            column_drift["drift_score"] = psi
+            column_drift["drift_detected"] = bool(psi >= self.psi_threshold or is_test_drift)
+            column_drift["reference"] = {"small_distribution": {"x": bins.tolist(),
+                                                                "y": reference_count.tolist()}}
+            column_drift["current"] = {"small_distribution": {"x": bins.tolist(),
+                                                              "y": current_count.tolist()}}
+            return column_drift
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def get_reference_histogram(self, reference_df:pd.DataFrame, columns:list)->dict:
+        """
+        Reference bins and counts of every column, the baseline of the online drift monitor
+        return: column -> {"column_type", "bins": bin edges or categories, "count"}
+        """
+        try:
+            reference_histogram = {}
+            empty_value = np.array([], dtype=np.float64)
+            for column in columns:
+                reference_value = DriftEngine.get_column_values(reference_df, column)
+                if column in self.categorical_columns:
+                    bins, reference_count, _ = DriftEngine.get_categorical_histogram(reference_value, empty_value)
+                    column_type = CATEGORICAL_COLUMN_TYPE
+                else:
+                    reference_value.sort()
+                    bins, reference_count, _ = self.get_numerical_histogram(reference_value, empty_value)
+                    column_type = NUMERICAL_COLUMN_TYPE
+                reference_histogram[column] = {"column_type": column_type,
+                                               "bins": bins.tolist(),
+                                               "count": reference_count.tolist()}
+            return reference_histogram
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    @staticmethod
+    def get_stratified_order(dataframe:pd.DataFrame, stratify_column:str = None, random_state:int = 42)->np.ndarray:
+        """
+        Row order whose every prefix is a stratified random sample, so progressive samples are nested.
+        Rows of each label are shuffled and spread evenly over [0, 1), the order sorts on that position.
+        """
+        rng = np.random.RandomState(random_state)
+        if stratify_column is None or stratify_column not in dataframe:
+            return rng.permutation(len(dataframe))
+        labels = dataframe[stratify_column].to_numpy()
+        position = np.empty(len(labels), dtype=np.float64)
+        for label in np.unique(labels):
+            label_index = np.flatnonzero(labels == label)
+            rng.shuffle(label_index)
+            position[label_index] = (np.arange(len(label_index)) + rng.uniform()) / len(label_index)
+        return np.argsort(position, kind="stable")
+
+    def get_ks_bound(self, sample_size:int, population_size:int)->float:
+        """
+        Dvoretzky-Kiefer-Wolfowitz bound on the sup distance between sample and population CDF,
+        holding with probability 1 - (1 - confidence) / 2 so that the bounds of both datasets hold together
+        """
+        if sample_size >= population_size:
+            return 0.0
+        alpha = 1 - self.confidence
+        return float(np.sqrt(np.log(4 / alpha) / (2 * sample_size)))
+
+    @staticmethod
+    def get_effective_size(reference_size:int, current_size:int)->float:
+        """
+        n_ref * n_cur / (n_ref + n_cur), the chi-square noncentrality of a fixed drift grows linearly with it
+        """
+        return reference_size * current_size / max(reference_size + current_size, 1)
+
+    def get_noncentrality_interval(self, statistic:float, degree_of_freedom:int):
+        """
+        Confidence interval of the noncentrality of the chi-square distribution behind an observed statistic
+        return: (low, high)
+        """
+        tail = (1 - self.confidence) / 2
+        def get_bound(statistic:float, cdf_value:float)->float:
+            #The cdf at the observed statistic falls as the noncentrality grows
+            if stat.chi2.cdf(statistic, degree_of_freedom) <= cdf_value:
+                return 0.0
+            high = max(statistic, 1.0)
+            while stat.ncx2.cdf(statistic, degree_of_freedom, high) > cdf_value:
+                high *= 2
+            return float(optimize.brentq(lambda noncentrality: stat.ncx2.cdf(statistic, degree_of_freedom, noncentrality) - cdf_value,
+                                         0.0, high))
+        #A statistic below its null mean would collapse the upper bound to 0, it is bounded as if at the mean
+        return get_bound(statistic, 1 - tail), get_bound(max(statistic, degree_of_freedom), tail)
+
+    def is_decision_settled(self, report:dict, ks_bound:float, size_ratio:float)->bool:
+        """
+        Every column is judged by the test that decides its drift.
+        Numerical columns are settled when their KS confidence interval no longer straddles ks_threshold.
+        Categorical columns are settled when the chi-square test on the sample and on the full datasets,
+        projected from both ends of the noncentrality interval (size_ratio is the full to sample
+        effective size ratio), all fall on the same side of chi_square_p_value.
+        """
+        for column_drift in report["metrics"][1]["result"]["drift_by_columns"].values():
+            if column_drift["column_type"] == CATEGORICAL_COLUMN_TYPE:
+                degree_of_freedom = len(column_drift["reference"]["small_distribution"]["x"]) - 1
+                if degree_of_freedom <= 0:
+                    continue
+                is_drift = column_drift["chi_square_p_value"] < self.chi_square_p_value
+                for noncentrality in self.get_noncentrality_interval(column_drift["chi_square_statistic"], degree_of_freedom):
+                    projected_p_value = stat.chi2.sf(degree_of_freedom + noncentrality * size_ratio, degree_of_freedom)
+                    if (projected_p_value < self.chi_square_p_value) != is_drift:
+                        return False
+            elif abs(column_drift["ks_statistic"] - self.ks_threshold) <= ks_bound:
+                return False
+        return True
+
+    def calculate(self, reference_df:pd.DataFrame, current_df:pd.DataFrame, columns:list,
+                  stratify_column:str = None)->dict:
+        """
+        Drift report on the full datasets or on stratified samples of them depending on sampling_mode.
+        Sampled reports record the sample sizes and the KS confidence interval of every column.
+        """
+        try:
+            if self.sampling_mode == SAMPLING_MODE_FULL:
+                return self.get_drift_report(reference_df, current_df, columns)
+            reference_order = DriftEngine.get_stratified_order(reference_df, stratify_column, self.random_state)
+            current_order = DriftEngine.get_stratified_order(current_df, stratify_column, self.random_state + 1)
+            sample_size = self.sample_size
+            rounds = 0
+            while True:
+                rounds += 1
+                reference_sample_size = min(sample_size, len(reference_df))
+                current_sample_size = min(sample_size, len(current_df))
+                logging.info(f"Drift sampling round [{rounds}] : [{reference_sample_size}] reference and [{current_sample_size}] current rows")
+                report = self.get_drift_report(reference_df.iloc[np.sort(reference_order[:reference_sample_size])],
+                                               current_df.iloc[np.sort(current_order[:current_sample_size])],
+                                               columns)
+                ks_bound = self.get_ks_bound(reference_sample_size, len(reference_df)) + \
+                           self.get_ks_bound(current_sample_size, len(current_df))
+                is_full_scan = reference_sample_size == len(reference_df) and current_sample_size == len(current_df)
+                size_ratio = DriftEngine.get_effective_size(len(reference_df), len(current_df)) / \
+                             DriftEngine.get_effective_size(reference_sample_size, current_sample_size)
+                if (self.sampling_mode != SAMPLING_MODE_PROGRESSIVE or is_full_scan or ks_bound <= self.max_bound
+                        or self.is_decision_settled(report, ks_bound, size_ratio)):
+                    break
+                sample_size *= 2
+
+            for column_drift in report["metrics"][1]["result"]["drift_by_columns"].values():
+                column_drift["ks_bound"] = ks_bound
+                column_drift["ks_interval"] = [max(column_drift["ks_statistic"] - ks_bound, 0.0),
+                                               min(column_drift["ks_statistic"] + ks_bound, 1.0)]
+            report["sampling"] = {"sampling_mode": self.sampling_mode,
+                                  "rounds": rounds,
+                                  "reference_size": len(reference_df),
+                                  "current_size": len(current_df),
+                                  "reference_sample_size": reference_sample_size,
+                                  "current_sample_size": current_sample_size,
+                                  "confidence": self.confidence,
+                                  "ks_bound": ks_bound}
+            logging.info(f"Drift sampling : {report['sampling']}")
+            return report
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def get_drift_report(self, reference_df:pd.DataFrame, current_df:pd.DataFrame, columns:list)->dict:
+        """
+        Columns are processed in a thread pool, the NumPy sort and search kernels release the GIL.
+        return: report dict shaped like the evidently DataDriftPreset json
+        """
+        try:
+            logging.info(f"Computing drift of [{len(columns)}] columns")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                column_drifts = list(executor.map(lambda column: self.get_column_drift(column, reference_df, current_df),
+                                                  columns))
+            number_of_columns = len(column_drifts)
+            number_of_drifted_columns = sum(column_drift["drift_detected"] for column_drift in column_drifts)
+            share_of_drifted_columns = number_of_drifted_columns / number_of_columns if number_of_columns else 0.0
+            dataset_drift = bool(number_of_columns > 0 and share_of_drifted_columns >= self.drift_share)
+            logging.info(f"Drifted columns : [{number_of_drifted_columns}/{number_of_columns}], dataset drift : [{dataset_drift}]")
+            return {
+                "metrics": [
+                    {"metric": "DatasetDriftMetric",
+                     "result": {"drift_share": self.drift_share,
+                                "number_of_columns": number_of_columns,
+                                "number_of_drifted_columns": number_of_drifted_columns,
+                                "share_of_drifted_columns": share_of_drifted_columns,
+                                "dataset_drift": dataset_drift}},
+                    {"metric": "DataDriftTable",
+                     "result": {"number_of_columns": number_of_columns,
+                                "number_of_drifted_columns": number_of_drifted_columns,
+                                "share_of_drifted_columns": share_of_drifted_columns,
+                                "dataset_drift": dataset_drift,
+                                "drift_by_columns": {column_drift["column_name"]: column_drift
+                                                     for column_drift in column_drifts}}}
+                ],
+                "timestamp": str(datetime.now())
+            }
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
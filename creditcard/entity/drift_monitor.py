@@ -0,0 +1,151 @@
+from creditcard.exception import CreditCardException
+from creditcard.logger import logging
+from creditcard.entity.drift_engine import DriftEngine, CATEGORICAL_COLUMN_TYPE
+
+import os, sys
+import json
+import time
+import uuid
+import threading
+import numpy as np
+
+WORKER_COUNT_FILE_EXTENSION = ".npy"
+#Rows binned per step, bounds the (rows, columns, edges) comparison array
+UPDATE_BLOCK_SIZE = 4096
+
+
+class DriftMonitor:
+    def __init__(self, reference_histogram:dict, feature_columns:list, monitor_dir:str,
+                 flush_interval_s:float = 10, psi_threshold:float = 0.2, drift_share:float = 0.5,
+                 ignore_columns:list = None):
+        """
+        Streaming histogram of the live prediction inputs against the training reference histogram.
+        Every worker process keeps one count array of fixed size and flushes it to its own file in
+        monitor_dir, get_drift merges the files of all workers.
+        feature_columns: column order of the arrays passed to update
+        ignore_columns: features that are not monitored, e.g. the ID column
+        """
+        try:
+            ignore_columns = ignore_columns or []
+            self.columns = [column for column in feature_columns
+                            if column in reference_histogram and column not in ignore_columns]
+            self.column_index = np.array([feature_columns.index(column) for column in self.columns], dtype=np.intp)
+            inner_edges = []
+            for column in self.columns:
+                bins = np.asarray(reference_histogram[column]["bins"], dtype=np.float64)
+                if reference_histogram[column]["column_type"] == CATEGORICAL_COLUMN_TYPE:
+                    #Category i gets the bin between the midpoints to its neighbours
+                    inner_edges.append((bins[1:] + bins[:-1]) / 2)
+                else:
+                    inner_edges.append(bins[1:-1])
+            #Columns with fewer edges are padded with inf, no value reaches those bins
+            self.edges = np.full((len(self.columns), max([len(edges) for edges in inner_edges] + [0])), np.inf)
+            for position, edges in enumerate(inner_edges):
+                self.edges[position, :len(edges)] = edges
+            bin_count = np.array([len(edges) + 1 for edges in inner_edges], dtype=np.intp)
+            self.offset = np.concatenate([[0], np.cumsum(bin_count)[:-1]]).astype(np.intp)
+            self.reference_count = np.concatenate([np.asarray(reference_histogram[column]["count"], dtype=np.int64)
+                                                   for column in self.columns])
+            self.count = np.zeros(len(self.reference_count), dtype=np.int64)
+
+            self.monitor_dir = monitor_dir
+            self.flush_interval_s = flush_interval_s
+            self.psi_threshold = psi_threshold
+            self.drift_share = drift_share
+            self.worker_file_path = None
+            self.last_flush = time.time()
+            self.lock = threading.Lock()
+            self.flush_lock = threading.Lock()
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    @staticmethod
+    def from_latest_reference(reference_histogram_dir:str, reference_histogram_file_name:str,
+                              feature_columns:list, monitor_dir:str, **kwargs):
+        """
+        return: monitor of the latest validation run holding a reference histogram, None when there is none
+        """
+        try:
+            run_folders = sorted(os.listdir(reference_histogram_dir)) if os.path.isdir(reference_histogram_dir) else []
+            for run_folder in reversed(run_folders):
+                reference_histogram_file_path = os.path.join(reference_histogram_dir, run_folder, reference_histogram_file_name)
+                if os.path.exists(reference_histogram_file_path):
+                    logging.info(f"Loading drift reference histogram from : [{reference_histogram_file_path}]")
+                    with open(reference_histogram_file_path) as reference_histogram_file:
+                        reference_histogram = json.load(reference_histogram_file)
+                    #Counts of different references must never be merged, so every reference gets its own folder
+                    return DriftMonitor(reference_histogram=reference_histogram, feature_columns=feature_columns,
+                                        monitor_dir=os.path.join(monitor_dir, run_folder), **kwargs)
+            logging.info(f"No drift reference histogram found in : [{reference_histogram_dir}]")
+            return None
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def update(self, input_array:np.ndarray):
+        """
+        Add a batch of raw inputs: bin index = number of edges at or below the value, shifted by the
+        column offset, then one bincount over the whole block.
+        """
+        try:
+            batch_count = np.zeros_like(self.count)
+            for start in range(0, len(input_array), UPDATE_BLOCK_SIZE):
+                value = input_array[start:start + UPDATE_BLOCK_SIZE, self.column_index]
+                bin_index = (value[:, :, None] >= self.edges[None, :, :]).sum(axis=2) + self.offset
+                batch_count += np.bincount(bin_index.ravel(), minlength=len(self.count))
+            with self.lock:
+                self.count += batch_count
+                is_flush_due = time.time() - self.last_flush >= self.flush_interval_s
+            if is_flush_due:
+                self.flush()
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def flush(self):
+        """
+        Atomically replace this worker's count file with the current counts
+        """
+        try:
+            with self.lock:
+                count = self.count.copy()
+                self.last_flush = time.time()
+                if self.worker_file_path is None:
+                    #pid alone can be reused by a later worker, which would overwrite these counts
+                    os.makedirs(self.monitor_dir, exist_ok=True)
+                    self.worker_file_path = os.path.join(self.monitor_dir,
+                                                         f"{os.getpid()}_{uuid.uuid4().hex[:8]}{WORKER_COUNT_FILE_EXTENSION}")
+            with self.flush_lock:
+                temporary_file_path = f"{self.worker_file_path}.tmp"
+                with open(temporary_file_path, "wb") as count_file:
+                    np.save(count_file, count)
+                os.replace(temporary_file_path, self.worker_file_path)
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def get_drift(self)->dict:
+        """
+        PSI of every column over the merged counts of all workers
+        """
+        try:
+            self.flush()
+            count = np.zeros_like(self.count)
+            for file_name in os.listdir(self.monitor_dir):
+                if file_name.endswith(WORKER_COUNT_FILE_EXTENSION):
+                    worker_count = np.load(os.path.join(self.monitor_dir, file_name))
+                    if worker_count.shape == count.shape:
+                        count += worker_count
+            column_drifts = {}
+            bin_end = np.append(self.offset[1:], len(count))
+            for column, start, end in zip(self.columns, self.offset, bin_end):
+                psi = DriftEngine.get_population_stability_index(self.reference_count[start:end], count[start:end])
+                column_drifts[column] = {"psi": psi, "drift_detected": bool(psi >= self.psi_threshold)}
+            number_of_drifted_columns = sum(column_drift["drift_detected"] for column_drift in column_drifts.values())
+            share_of_drifted_columns = number_of_drifted_columns / len(column_drifts) if column_drifts else 0.0
+            rows = int(count[:bin_end[0]].sum()) if len(self.columns) > 0 else 0
+            return {"rows": rows,
+                    "number_of_columns": len(column_drifts),
+                    "number_of_drifted_columns": number_of_drifted_columns,
+                    "share_of_drifted_columns": share_of_drifted_columns,
+                    "dataset_drift": bool(rows > 0 and share_of_drifted_columns >= self.drift_share),
+                    "drift_by_columns": column_drifts}
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
@@ -0,0 +1,106 @@
+from creditcard.exception import CreditCardException
+from creditcard.logger import logging
+
+import sys
+import numpy as np
+
+FEATURE_GENERATOR_STEP = "feature_generator"
+SCALER_STEP = "sclar"
+#Codes of the remapped column the pipeline accepts, FeatureGenerator turns any other code into nan
+REPLACE_VALUE_DOMAIN = np.array([1, 2])
+
+
+class FusedLinearModel:
+    def __init__(self, feature_columns:list, linear_index:np.ndarray, linear_weight:np.ndarray,
+                 boxcox_index:np.ndarray, boxcox_lambda:np.ndarray, boxcox_weight:np.ndarray,
+                 intercept:float, classes:np.ndarray, replace_index:int):
+        """
+        Preprocessing pipeline and binary linear classifier folded into precomputed arrays.
+        feature_columns: raw input column order expected by predict
+        linear_index: raw columns entering the score linearly, the dropped column is left out
+        boxcox_index: raw columns that are clipped at zero and Box cox transformed
+        replace_index: raw column whose codes are folded in as an affine map, checked against REPLACE_VALUE_DOMAIN
+        """
+        self.feature_columns = feature_columns
+        self.linear_index = linear_index
+        self.linear_weight = linear_weight
+        self.boxcox_index = boxcox_index
+        self.boxcox_lambda = boxcox_lambda
+        self.boxcox_weight = boxcox_weight
+        self.intercept = intercept
+        self.classes = classes
+        self.replace_index = replace_index
+        self.log_mask = boxcox_lambda == 0
+        self.safe_lambda = np.where(self.log_mask, 1.0, boxcox_lambda)
+
+    @staticmethod
+    def from_estimator(preprocessing_object, trained_model_object):
+        """
+        Export the fitted ColumnTransformer -> FeatureGenerator -> StandardScaler -> linear model chain.
+        return: FusedLinearModel or None when the chain can not be folded (e.g. tree based model)
+        """
+        try:
+            coef = getattr(trained_model_object, "coef_", None)
+            if coef is None or coef.ndim != 2 or coef.shape[0] != 1 or len(trained_model_object.classes_) != 2:
+                logging.info(f"Model [{type(trained_model_object).__name__}] is not a binary linear model, skipping fused export")
+                return None
+            _, pipeline, feature_columns = preprocessing_object.transformers_[0]
+            feature_generator = pipeline.named_steps[FEATURE_GENERATOR_STEP]
+            scaler = pipeline.named_steps[SCALER_STEP]
+            if not hasattr(feature_generator, "lambdas_"):
+                logging.info(f"Feature generator has no fitted Box cox lambda, skipping fused export")
+                return None
+            feature_columns = list(feature_columns)
+
+            #Fold the scaler into the model coefficient: ((t - mean) / scale) . w + b = t . (w / scale) + b'
+            output_columns = [column for column in feature_columns if column != feature_generator.column_to_be_droped]
+            weight = coef[0] / (scaler.scale_ if scaler.scale_ is not None else 1.0)
+            mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(len(output_columns))
+            intercept = float(trained_model_object.intercept_[0] - np.dot(mean, weight))
+            column_weight = dict(zip(output_columns, weight))
+
+            #SEX is remapped 2 -> 0, 1 -> 1 which is the affine map 2 - x
+            replace_column = feature_generator.column_needs_to_replace_value
+            intercept += 2 * column_weight[replace_column]
+            column_weight[replace_column] = -column_weight[replace_column]
+
+            boxcox_columns = list(feature_generator.coumn_needs_to_be_transformed_to_normal_distribution)
+            linear_columns = [column for column in output_columns if column not in boxcox_columns]
+            return FusedLinearModel(
+                feature_columns=feature_columns,
+                linear_index=np.array([feature_columns.index(column) for column in linear_columns]),
+                linear_weight=np.array([column_weight[column] for column in linear_columns]),
+                boxcox_index=np.array([feature_columns.index(column) for column in boxcox_columns]),
+                boxcox_lambda=np.asarray(feature_generator.lambdas_, dtype=np.float64),
+                boxcox_weight=np.array([column_weight[column] for column in boxcox_columns]),
+                intercept=intercept,
+                classes=trained_model_object.classes_,
+                replace_index=feature_columns.index(replace_column)
+            )
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def decision_function(self, X:np.ndarray)->np.ndarray:
+        """
+        X: raw float array with the columns in feature_columns order
+        """
+        X = np.asarray(X, dtype=np.float64)
+        #The affine map 2 - x scores any code, reject the ones the pipeline would fail on
+        is_invalid_code = ~np.isin(X[:, self.replace_index], REPLACE_VALUE_DOMAIN)
+        if is_invalid_code.any():
+            raise ValueError(f"Column [{self.feature_columns[self.replace_index]}] has codes outside "
+                             f"{REPLACE_VALUE_DOMAIN.tolist()} in rows {np.flatnonzero(is_invalid_code).tolist()}")
+        boxcox_value = X[:, self.boxcox_index]
+        np.maximum(boxcox_value, 0, out=boxcox_value)
+        boxcox_value += 1
+        transformed_value = (np.power(boxcox_value, self.boxcox_lambda) - 1) / self.safe_lambda
+        if self.log_mask.any():
+            transformed_value[:, self.log_mask] = np.log(boxcox_value[:, self.log_mask])
+        decision = X[:, self.linear_index] @ self.linear_weight + transformed_value @ self.boxcox_weight + self.intercept
+        #nan in any input column fails the pipeline model as well instead of scoring as the negative class
+        if not np.isfinite(decision).all():
+            raise ValueError(f"Input contains nan or infinity in rows {np.flatnonzero(~np.isfinite(decision)).tolist()}")
+        return decision
+
+    def predict(self, X:np.ndarray)->np.ndarray:
+        return self.classes[(self.decision_function(X) > 0).astype(np.intp)]
@@ -0,0 +1,92 @@
+from creditcard.exception import CreditCardException
+
+import scipy.stats as stat
+import numpy as np
+import sys
+
+#Rows predicted per step, bounds the probability arrays of one pass
+PREDICTION_BLOCK_SIZE = 65536
+#Probability clip of the log loss, keeps log(0) out of it
+LOG_LOSS_EPSILON = 1e-15
+POSITIVE_CLASS = 1
+
+
+def get_confusion_counts(y_true:np.ndarray, y_pred:np.ndarray)->np.ndarray:
+    """
+    Binary confusion counts with one bincount over the code 2 * y_true + y_pred
+    return: [[tn, fp], [fn, tp]] with class 1 as the positive class
+    """
+    return np.bincount(2 * np.asarray(y_true, dtype=np.intp) + np.asarray(y_pred, dtype=np.intp),
+                       minlength=4)[:4].reshape(2, 2)
+
+
+def get_roc_auc(y_true:np.ndarray, y_score:np.ndarray)->float:
+    """
+    Area under the ROC curve as the Mann-Whitney U statistic of the tie averaged score ranks
+    return: nan when y_true holds one class only
+    """
+    is_positive = np.asarray(y_true) == POSITIVE_CLASS
+    number_of_positives = int(is_positive.sum())
+    number_of_negatives = len(is_positive) - number_of_positives
+    if number_of_positives == 0 or number_of_negatives == 0:
+        return float("nan")
+    positive_rank_sum = stat.rankdata(y_score)[is_positive].sum()
+    return float((positive_rank_sum - number_of_positives * (number_of_positives + 1) / 2)
+                 / (number_of_positives * number_of_negatives))
+
+
+def get_classification_metrics(model, X:np.ndarray, y:np.ndarray)->dict:
+    """
+    Every metric of one split from a single prediction pass over row blocks.
+    Labels are the argmax of predict_proba, so no separate predict call is made. Models without
+    predict_proba are ranked by decision_function and get no log loss.
+    return: dict of accuracy, precision, recall, f1_score, roc_auc, log_loss and the confusion counts
+    """
+    try:
+        has_probability = hasattr(model, "predict_proba")
+        classes = np.asarray(model.classes_)
+        positive_column = int(np.flatnonzero(classes == POSITIVE_CLASS)[0])
+        confusion_counts = np.zeros((2, 2), dtype=np.int64)
+        y_score = np.empty(len(y), dtype=np.float64)
+        log_loss_sum = 0.0
+        for start in range(0, len(y), PREDICTION_BLOCK_SIZE):
+            X_block = X[start:start + PREDICTION_BLOCK_SIZE]
+            y_block = np.asarray(y[start:start + PREDICTION_BLOCK_SIZE])
+            if has_probability:
+                probability = model.predict_proba(X_block)
+                y_pred = classes[probability.argmax(axis=1)]
+                positive_probability = np.clip(probability[:, positive_column], LOG_LOSS_EPSILON, 1 - LOG_LOSS_EPSILON)
+                log_loss_sum -= np.where(y_block == POSITIVE_CLASS, np.log(positive_probability),
+                                         np.log1p(-positive_probability)).sum()
+                y_score[start:start + len(y_block)] = positive_probability
+            else:
+                decision = model.decision_function(X_block)
+                y_pred = classes[(decision > 0).astype(np.intp)]
+                y_score[start:start + len(y_block)] = decision
+            confusion_counts += get_confusion_counts(y_true=y_block, y_pred=y_pred)
+
+        (true_negative, false_positive), (false_negative, true_positive) = confusion_counts
+        precision = true_positive / (true_positive + false_positive) if true_positive + false_positive > 0 else 0.0
+        recall = true_positive / (true_positive + false_negative) if true_positive + false_negative > 0 else 0.0
+        f1_score = 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0
+        return {"accuracy": float((true_positive + true_negative) / max(len(y), 1)),
+                "precision": float(precision),
+                "recall": float(recall),
+                "f1_score": float(f1_score),
+                "roc_auc": get_roc_auc(y_true=y, y_score=y_score),
+                "log_loss": float(log_loss_sum / max(len(y), 1)) if has_probability else None,
+                "confusion_counts": confusion_counts.tolist()}
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
+
+
+def get_train_test_metrics(model, X_train:np.ndarray, y_train:np.ndarray,
+                           X_test:np.ndarray, y_test:np.ndarray)->tuple:
+    """
+    return: (train metrics, test metrics) of get_classification_metrics
+    """
+    try:
+        return (get_classification_metrics(model=model, X=X_train, y=y_train),
+                get_classification_metrics(model=model, X=X_test, y=y_test))
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
@@ -3,11 +3,17 @@ from creditcard.logger import logging
 from creditcard.entity.artifact_entity import *
 from creditcard.entity.config_entity import *
 from creditcard.util.util import *
-from sklearn.metrics import accuracy_score, confusion_matrix
+from creditcard.entity.search_scheduler import SearchScheduler
+from creditcard.entity.cv_result_store import CVResultStore
+from creditcard.entity.metric_engine import get_train_test_metrics
+from sklearn.model_selection import GridSearchCV, RandomizedSearchCV, ParameterGrid, ParameterSampler, check_cv
+from sklearn.base import is_classifier
 
 import numpy as np
 import sys, os
 import importlib
+import inspect
+import scipy.stats as stat
 from typing import List
 
 GRID_SEARCH_KEY = 'grid_search'
@@ -16,6 +22,26 @@ CLASS_KEY = 'class'
 PARAM_KEY = 'params'
 MODEL_SELECTION_KEY = 'model_selection'
 SEARCH_PARAM_GRID_KEY = "search_param_grid"
+SEARCH_SCHEDULER_KEY = "search_scheduler"
+N_JOBS_KEY = "n_jobs"
+BUDGET_KEY = "budget"
+TIME_BUDGET_KEY = "time_budget_s"
+MODEL_TIME_BUDGET_KEY = "model_time_budget_s"
+FIT_MEMORY_LIMIT_KEY = "fit_memory_limit_mb"
+CV_KEY = "cv"
+SCORING_KEY = "scoring"
+ERROR_SCORE_KEY = "error_score"
+N_ITER_KEY = "n_iter"
+RANDOM_STATE_KEY = "random_state"
+DISTRIBUTION_KEY = "distribution"
+DISTRIBUTION_ARGS_KEY = "args"
+PARAM_GRID_ARGUMENT = "param_grid"
+PARAM_DISTRIBUTIONS_ARGUMENT = "param_distributions"
+#Search classes (and their subclasses) whose candidate x fold fits the search scheduler can run
+SCHEDULED_SEARCH_CLASSES = (GridSearchCV, RandomizedSearchCV)
+#Successive halving searches are still experimental in sklearn and have to be enabled before import
+HALVING_SEARCH_CLASSES = ["HalvingGridSearchCV", "HalvingRandomSearchCV"]
+HALVING_SEARCH_ENABLE_MODULE = "sklearn.experimental.enable_halving_search_cv"
 
 InitializedModelDetail = namedtuple("InitializedModelDetail",
                                     ["model_serial_number", "model", "param_grid_search", "model_name"])
@@ -35,69 +61,66 @@ BestModel = namedtuple("BestModel", ["model_serial_number",
 
 MetricInfoArtifact = namedtuple("MetricInfoArtifact",
                                 ["model_name", "model_object", "recall", "precession", "f1_score", "train_accuracy",
-                                 "test_accuracy", "model_accuracy", "index_number"])
+                                 "test_accuracy", "model_accuracy", "index_number", "roc_auc", "log_loss", "cv_score"])
 
 
 
 def evaluate_classification_model(model_list:list, X_train:np.ndarray, y_train:np.ndarray, 
-                              X_test:np.ndarray, y_test:np.ndarray, base_accuracy:float= 0.6)->MetricInfoArtifact:
+                              X_test:np.ndarray, y_test:np.ndarray, base_accuracy:float= 0.6,
+                              cv_scores:list = None)->MetricInfoArtifact:
     """
     Description:
-    This function compare multiple regression model return best model
+    This function compare multiple classification model return best model
     Params:
     model_list: List of model
     X_train: Training dataset input feature
     y_train: Training dataset target feature
     X_test: Testing dataset input feature
     y_test: Testing dataset input feature
+    cv_scores: best cross validation score of every model from the parameter search, reported as is
     return
     It retured a named tuple
     
     MetricInfoArtifact = namedtuple("MetricInfo",
                                 ["model_name", "model_object", "recall", "precession", "f1_score", "train_accuracy",
-                                 "test_accuracy", "model_accuracy", "index_number"])
+                                 "test_accuracy", "model_accuracy", "index_number", "roc_auc", "log_loss", "cv_score"])
     """
     try:
+        cv_scores = cv_scores if cv_scores is not None else [None] * len(model_list)
         index_number = 0
         metric_info_artifact = None
-        for model in model_list:
+        for model, cv_score in zip(model_list, cv_scores):
             model_name = str(model)
             logging.info(f"{'>>'*30}Started evaluating model: [{type(model).__name__}] {'<<'*30}")
             
-            #Getting prediction for train and test data 
-            y_train_pred = model.predict(X_train)
-            y_test_pred = model.predict(X_test)
+            #One prediction pass per split gives every metric
+            train_metrics, test_metrics = get_train_test_metrics(model=model, X_train=X_train, y_train=y_train,
+                                                                 X_test=X_test, y_test=y_test)
             
-            #Calculating accuracy_score for train and test data 
-            train_acc = accuracy_score(y_train, y_train_pred)
-            test_acc = accuracy_score(y_test, y_test_pred)
+            train_acc = train_metrics["accuracy"]
+            test_acc = test_metrics["accuracy"]
             
-            #Calculate Confustion Matrix
-            confusion_mat = confusion_matrix(y_test, y_test_pred)
-            
-            true_positive = confusion_mat[0][0]
-            false_postitive = confusion_mat[0][1]
-            false_negative = confusion_mat[1][0]
-            true_negative = confusion_mat[1][1]
-            
-            #Calculate recall precession and f1_score
-            recall = true_positive/(true_positive+false_negative)
-            precession = true_positive/(true_positive+false_postitive)
-            f1_score = 2*(precession * recall) / (precession+recall)
+            #Class 1 (default) is the positive class of recall precession and f1_score
+            recall = test_metrics["recall"]
+            precession = test_metrics["precision"]
+            f1_score = test_metrics["f1_score"]
             
             model_accuracy = (2 * (train_acc * test_acc)) / (train_acc + test_acc)
             diff_test_train_acc = abs(test_acc - train_acc)
             
             #Logging all important metric
             logging.info(f"{'>>'*30} Score {'<<'*30}")
-            logging.info(f"Train Score\t\t Test Score\t\t Average Score")
-            logging.info(f"{train_acc}\t\t {test_acc}\t\t{model_accuracy}")
+            logging.info(f"Train Score\t\t Test Score\t\t Average Score\t\t CV Score")
+            logging.info(f"{train_acc}\t\t {test_acc}\t\t{model_accuracy}\t\t{cv_score}")
 
             logging.info(f"{'>>'*30} Loss {'<<'*30}")
             logging.info(f"Diff test train accuracy: [{diff_test_train_acc}].") 
             logging.info(f"Recall for test data : [{recall}].")
             logging.info(f"precession for test Data : [{precession}].")
             logging.info(f"f1_score for test Data : [{f1_score}].")
+            logging.info(f"roc_auc for test Data : [{test_metrics['roc_auc']}].")
+            logging.info(f"log_loss for test Data : [{test_metrics['log_loss']}].")
+            logging.info(f"Confusion counts [[tn, fp], [fn, tp]] for test Data : {test_metrics['confusion_counts']}")
             
             #if model accuracy is greater than base accuracy and train and test score is within certain thershold
             #we will accept that model as accepted model
@@ -111,7 +134,10 @@ def evaluate_classification_model(model_list:list, X_train:np.ndarray, y_train:n
                                                           train_accuracy=train_acc,
                                                           test_accuracy=test_acc,
                                                           model_accuracy=model_accuracy,
-                                                          index_number=index_number)
+                                                          index_number=index_number,
+                                                          roc_auc=test_metrics["roc_auc"],
+                                                          log_loss=test_metrics["log_loss"],
+                                                          cv_score=cv_score)
                 logging.info(f"Acceptable model found {metric_info_artifact}. ")
             index_number += 1
         return metric_info_artifact
@@ -120,7 +146,12 @@ def evaluate_classification_model(model_list:list, X_train:np.ndarray, y_train:n
 
 
 class ModelFactory:
-    def __init__(self, model_config_file_path:str = None):
+    def __init__(self, model_config_file_path:str = None, cv_result_store_file_path:str = None,
+                 cv_result_store_size:int = None):
+        """
+        cv_result_store_file_path: fold results of earlier runs are reused from this store when
+        cv_result_store_size is set, only the missing fits of the scheduled searches run
+        """
         try:
             self.config:dict = read_yaml_file(file_path=model_config_file_path)
             
@@ -130,6 +161,14 @@ class ModelFactory:
             
             self.models_initialization_config:dict = dict(self.config[MODEL_SELECTION_KEY])
             
+            #Without a search_scheduler block every search runs on its own, one after another
+            self.search_scheduler_config:dict = self.config.get(SEARCH_SCHEDULER_KEY)
+            self.budget_config:dict = dict(self.config.get(BUDGET_KEY) or {})
+            self.cv_result_store = None
+            if cv_result_store_file_path is not None and cv_result_store_size:
+                self.cv_result_store = CVResultStore(store_file_path=cv_result_store_file_path,
+                                                     max_entries=cv_result_store_size)
+            
             self.initialized_model_list = None
             self.grid_searched_best_model_list = None
         except Exception as e:
@@ -193,12 +232,17 @@ class ModelFactory:
         """
         
         try:
-            grid_search_cv_ref = ModelFactory.class_for_name(module_name = self.grid_search_cv_module,
-                                                             class_name = self.grid_search_cv_class)
+            grid_search_cv_ref = self.get_grid_search_cv_ref()
+            #Grid searches take the search space as param_grid, randomized searches as param_distributions
+            search_space_argument = ModelFactory.get_search_space_argument(grid_search_cv_ref=grid_search_cv_ref,
+                                                                           search_space=initialized_model.param_grid_search)
             grid_search_cv = grid_search_cv_ref(estimator= initialized_model.model,
-                                                param_grid = initialized_model.param_grid_search)
+                                                **{search_space_argument: initialized_model.param_grid_search})
             grid_search_cv = ModelFactory.update_property_of_class(instance_ref=grid_search_cv,
                                                                    property_data=self.grid_search_cv_property_data)
+            if N_JOBS_KEY not in self.grid_search_cv_property_data and self.get_search_n_jobs() > 1:
+                #Searches the scheduler cannot split still use the configured workers for their own fits
+                grid_search_cv.n_jobs = self.get_search_n_jobs()
             
             message = f'{">>"* 30} f"Training {type(initialized_model.model).__name__} Started." {"<<"*30}'
             logging.info(message)
@@ -215,6 +259,129 @@ class ModelFactory:
         except Exception as e:
             raise CreditCardException(e, sys) from e
         
+    def get_grid_search_cv_ref(self):
+        """
+        return: search class configured in grid_search
+        """
+        try:
+            if self.grid_search_cv_class in HALVING_SEARCH_CLASSES:
+                importlib.import_module(HALVING_SEARCH_ENABLE_MODULE)
+            return ModelFactory.class_for_name(module_name = self.grid_search_cv_module,
+                                               class_name = self.grid_search_cv_class)
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    @staticmethod
+    def get_search_space(search_param_grid):
+        """
+        Values of a search_param_grid are lists of candidates or a distribution mapping
+        {distribution: <scipy.stats name>, args: [...]} for the randomized searches, e.g.
+        C: {distribution: loguniform, args: [1.e-02, 1.e+02]}
+        return: search space with the distributions as frozen scipy.stats objects
+        """
+        try:
+            if isinstance(search_param_grid, list):
+                return [ModelFactory.get_search_space(search_param_grid=grid) for grid in search_param_grid]
+            search_space = {}
+            for param_name, values in search_param_grid.items():
+                if isinstance(values, dict):
+                    distribution = getattr(stat, values[DISTRIBUTION_KEY])
+                    values = distribution(*values.get(DISTRIBUTION_ARGS_KEY, []))
+                search_space[param_name] = values
+            return search_space
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    @staticmethod
+    def check_param_grid(search_space, search_class_name:str):
+        """
+        Grid searches need a list of values for every parameter
+        """
+        grids = search_space if isinstance(search_space, list) else [search_space]
+        for grid in grids:
+            for param_name, values in grid.items():
+                if not isinstance(values, (list, tuple)):
+                    raise Exception(f"{search_class_name} needs a list of values for [{param_name}], "
+                                    f"distributions are only supported by the randomized searches")
+    
+    @staticmethod
+    def get_search_space_argument(grid_search_cv_ref, search_space)->str:
+        """
+        return: name of the search class argument taking the search space
+        """
+        try:
+            search_arguments = inspect.signature(grid_search_cv_ref).parameters
+            if PARAM_DISTRIBUTIONS_ARGUMENT in search_arguments:
+                return PARAM_DISTRIBUTIONS_ARGUMENT
+            if PARAM_GRID_ARGUMENT not in search_arguments:
+                raise Exception(f"{grid_search_cv_ref.__name__} takes neither {PARAM_GRID_ARGUMENT} nor {PARAM_DISTRIBUTIONS_ARGUMENT}")
+            ModelFactory.check_param_grid(search_space=search_space, search_class_name=grid_search_cv_ref.__name__)
+            return PARAM_GRID_ARGUMENT
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def get_search_n_jobs(self)->int:
+        """
+        return: worker processes of the search scheduler, 1 when the searches run sequentially
+        """
+        if self.search_scheduler_config is None:
+            return 1
+        n_jobs = self.search_scheduler_config.get(N_JOBS_KEY) or 1
+        #-1 uses every core like the n_jobs of sklearn
+        return (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+    
+    def get_search_candidates(self, initialized_model: InitializedModelDetail)->list:
+        """
+        return: parameter dicts the configured search class would try, in its order
+        """
+        try:
+            #Searches taking param_distributions sample their candidates, param_grid searches try all of them
+            search_space_argument = ModelFactory.get_search_space_argument(grid_search_cv_ref=self.get_grid_search_cv_ref(),
+                                                                           search_space=initialized_model.param_grid_search)
+            if search_space_argument == PARAM_DISTRIBUTIONS_ARGUMENT:
+                return list(ParameterSampler(initialized_model.param_grid_search,
+                                             n_iter=self.grid_search_cv_property_data.get(N_ITER_KEY, 10),
+                                             random_state=self.grid_search_cv_property_data.get(RANDOM_STATE_KEY)))
+            return list(ParameterGrid(initialized_model.param_grid_search))
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
+    def execute_scheduled_search_operation(self, initialized_model_list: List[InitializedModelDetail],
+                                           input_feature, output_feature)->List[GridSearchedBestModel]:
+        """
+        Candidate x fold fits of all models run as one task pool of the search scheduler.
+        Folds and scoring are taken from the grid_search params, the way the search class would use them.
+        """
+        try:
+            estimators = [initialized_model.model for initialized_model in initialized_model_list]
+            candidates = [self.get_search_candidates(initialized_model=initialized_model)
+                          for initialized_model in initialized_model_list]
+            cv = check_cv(self.grid_search_cv_property_data.get(CV_KEY), output_feature,
+                          classifier=all(is_classifier(estimator) for estimator in estimators))
+            splits = list(cv.split(input_feature, output_feature))
+            
+            search_scheduler = SearchScheduler(n_jobs=self.get_search_n_jobs(), cv_result_store=self.cv_result_store,
+                                               time_budget_s=self.budget_config.get(TIME_BUDGET_KEY),
+                                               model_time_budget_s=self.budget_config.get(MODEL_TIME_BUDGET_KEY),
+                                               fit_memory_limit_mb=self.budget_config.get(FIT_MEMORY_LIMIT_KEY),
+                                               error_score=self.grid_search_cv_property_data.get(ERROR_SCORE_KEY, np.nan))
+            search_results = search_scheduler.search(X=input_feature, y=output_feature, estimators=estimators,
+                                                     candidates=candidates, splits=splits,
+                                                     scoring=self.grid_search_cv_property_data.get(SCORING_KEY))
+            grid_searched_best_model_list = []
+            for initialized_model, search_result in zip(initialized_model_list, search_results):
+                if search_result is None:
+                    #Nothing of this model finished within the budget, the rest still compete
+                    continue
+                grid_searched_best_model_list.append(GridSearchedBestModel(model_serial_number=initialized_model.model_serial_number,
+                                                                           model=initialized_model.model,
+                                                                           best_model=search_result["best_model"],
+                                                                           best_parameters=search_result["best_parameters"],
+                                                                           best_score=search_result["best_score"]))
+            return grid_searched_best_model_list
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+        
     def get_initialized_model_list(self)->List[InitializedModelDetail]:
         """
         From the model_initialization_config it will extract the dictionary .
@@ -235,7 +402,7 @@ class ModelFactory:
                     model_obj_property_data = dict(model_initialization_config[PARAM_KEY])
                     model = ModelFactory.update_property_of_class(instance_ref=model,
                                                                   property_data=model_obj_property_data)
-                param_grid_search = model_initialization_config[SEARCH_PARAM_GRID_KEY]
+                param_grid_search = ModelFactory.get_search_space(search_param_grid=model_initialization_config[SEARCH_PARAM_GRID_KEY])
                 model_name = f"{model_initialization_config[MODULE_KEY]}.{model_initialization_config[CLASS_KEY]}"
                 model_initialization_config = InitializedModelDetail(model_serial_number=model_serial_number,
                                                                      model=model,
@@ -281,6 +448,19 @@ class ModelFactory:
         return: Function will return a GridSearchOperation
         """
         try:
+           is_budgeted = any(value is not None for value in self.budget_config.values())
+           is_scheduled = self.get_search_n_jobs() > 1 or self.cv_result_store is not None or is_budgeted
+           if is_scheduled and issubclass(self.get_grid_search_cv_ref(), SCHEDULED_SEARCH_CLASSES):
+               self.grid_searched_best_model_list = self.execute_scheduled_search_operation(
+                                                    initialized_model_list=initialized_model_list,
+                                                    input_feature=input_feature,
+                                                    output_feature=output_feature)
+               return self.grid_searched_best_model_list
+           
+           if is_budgeted:
+               logging.info(f"Budgets {self.budget_config} are only enforced for "
+                            f"{[search_class.__name__ for search_class in SCHEDULED_SEARCH_CLASSES]}, "
+                            f"[{self.grid_search_cv_class}] runs without them")
            self.grid_searched_best_model_list = []
            for initialized_model_detail in initialized_model_list:
                grid_searched_best_model :GridSearchedBestModel = self.execute_grid_search_operation(
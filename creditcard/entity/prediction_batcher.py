@@ -0,0 +1,111 @@
+from creditcard.exception import CreditCardException
+from creditcard.logger import logging
+
+from concurrent.futures import Future
+import sys
+import time
+import queue
+import threading
+
+
+class PredictionBatcher:
+    def __init__(self, predict_batch, prepare_record=None, batch_window_ms:float = 3, max_batch_size:int = 256):
+        """
+        Coalesce concurrent single record predictions into one vectorized batch.
+        predict_batch: callable taking a list of records and returning one prediction per record
+        prepare_record: optional callable validating a record and converting it to exactly one row,
+        it runs on the caller's thread so an invalid record never joins a batch
+        batch_window_ms: how long the first queued record waits for others to join its batch
+        max_batch_size: a batch is scored as soon as it holds this many records
+        """
+        try:
+            self.predict_batch = predict_batch
+            self.prepare_record = prepare_record
+            self.batch_window = batch_window_ms / 1000.0
+            self.max_batch_size = max_batch_size
+            self.request_queue = queue.Queue()
+            self.worker = None
+            self.worker_lock = threading.Lock()
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def start(self):
+        """
+        The worker thread is started lazily so that it lives in the process serving requests
+        and not in a parent that forks gunicorn workers.
+        """
+        if self.worker is None:
+            with self.worker_lock:
+                if self.worker is None:
+                    worker = threading.Thread(target=self.run, name="prediction-batcher", daemon=True)
+                    worker.start()
+                    self.worker = worker
+
+    def submit(self, record) -> Future:
+        """
+        raise: the error of prepare_record as is, so the caller can tell an invalid record apart
+        """
+        if self.prepare_record is not None:
+            record = self.prepare_record(record)
+        try:
+            self.start()
+            future = Future()
+            self.request_queue.put((record, future))
+            return future
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def predict(self, record, timeout:float = None):
+        """
+        Blocks the calling thread until the batch holding its record is scored.
+        """
+        future = self.submit(record)
+        try:
+            return future.result(timeout=timeout)
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def collect_batch(self) -> list:
+        batch = [self.request_queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.request_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def score_batch(self, batch:list):
+        """
+        Score the batch and resolve every future with its own prediction, a prediction count not
+        matching the batch fails every future instead of handing out shifted results
+        """
+        predictions = list(self.predict_batch([record for record, _ in batch]))
+        if len(predictions) != len(batch):
+            error = Exception(f"Scoring returned [{len(predictions)}] predictions for [{len(batch)}] records")
+            logging.info(f"{error}")
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        for (_, future), prediction in zip(batch, predictions):
+            future.set_result(prediction)
+
+    def run(self):
+        while True:
+            batch = self.collect_batch()
+            try:
+                self.score_batch(batch)
+            except Exception as e:
+                logging.info(f"Scoring batch of size [{len(batch)}] failed : {e}")
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    continue
+                #Score every record on its own, so only the request of the failing record errors
+                for record, future in batch:
+                    try:
+                        self.score_batch([(record, future)])
+                    except Exception as record_error:
+                        future.set_exception(record_error)
@@ -0,0 +1,87 @@
+from creditcard.exception import CreditCardException
+from creditcard.logger import logging
+
+import pandas as pd
+import numpy as np
+import sys
+
+ALLOWED_VALUES_KEY = "allowed_values"
+RANGES_KEY = "ranges"
+NOT_NULL_KEY = "not_null"
+MIN_KEY = "min"
+MAX_KEY = "max"
+
+
+class SchemaConstraints:
+    def __init__(self, constraints:dict):
+        """
+        Row level constraints of schema.yaml compiled into column lists and bound arrays.
+        allowed_values: column -> list of allowed codes
+        ranges: column -> {min, max}, either bound may be left out
+        not_null: list of columns that must not hold a missing value
+        Missing values only count against not_null, never against allowed_values or ranges.
+        """
+        try:
+            constraints = constraints or {}
+            allowed_values = constraints.get(ALLOWED_VALUES_KEY) or {}
+            ranges = constraints.get(RANGES_KEY) or {}
+            self.allowed_columns = list(allowed_values)
+            self.allowed_values = [np.array(values, dtype=np.float64) for values in allowed_values.values()]
+            self.range_columns = list(ranges)
+            self.range_min = np.array([bound.get(MIN_KEY, -np.inf) for bound in ranges.values()], dtype=np.float64)
+            self.range_max = np.array([bound.get(MAX_KEY, np.inf) for bound in ranges.values()], dtype=np.float64)
+            self.not_null_columns = list(constraints.get(NOT_NULL_KEY) or [])
+            self.constraint_names = [f"{ALLOWED_VALUES_KEY}:{column}" for column in self.allowed_columns] + \
+                                    [f"{RANGES_KEY}:{column}" for column in self.range_columns] + \
+                                    [f"{NOT_NULL_KEY}:{column}" for column in self.not_null_columns]
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    @property
+    def columns(self)->list:
+        return list(dict.fromkeys(self.allowed_columns + self.range_columns + self.not_null_columns))
+
+    def get_violation_mask(self, dataframe:pd.DataFrame)->np.ndarray:
+        """
+        return: boolean array (rows, constraints), True where the row violates the constraint
+        """
+        try:
+            mask = np.empty((len(dataframe), len(self.constraint_names)), dtype=bool)
+            position = 0
+            for column, values in zip(self.allowed_columns, self.allowed_values):
+                column_value = dataframe[column].to_numpy(dtype=np.float64, na_value=np.nan)
+                mask[:, position] = ~np.isin(column_value, values) & ~np.isnan(column_value)
+                position += 1
+            if self.range_columns:
+                #All range constraints in one broadcast comparison against the bound arrays, nan compares False
+                range_value = dataframe[self.range_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+                mask[:, position:position + len(self.range_columns)] = (range_value < self.range_min) | (range_value > self.range_max)
+                position += len(self.range_columns)
+            if self.not_null_columns:
+                mask[:, position:] = dataframe[self.not_null_columns].isna().to_numpy()
+            return mask
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+
+    def count_violations(self, dataframe:pd.DataFrame, chunk_size:int = None)->dict:
+        """
+        Evaluate the mask over row chunks so that memory stays bounded by chunk_size rows.
+        return: {"rows", "invalid_rows", "violations": constraint name -> violating row count}
+        """
+        try:
+            missing_columns = [column for column in self.columns if column not in dataframe]
+            if len(missing_columns) > 0:
+                raise Exception(f"Constraint columns {missing_columns} are not present in the dataset")
+            chunk_size = chunk_size or max(len(dataframe), 1)
+            violation_count = np.zeros(len(self.constraint_names), dtype=np.int64)
+            invalid_rows = 0
+            for start in range(0, len(dataframe), chunk_size):
+                mask = self.get_violation_mask(dataframe.iloc[start:start + chunk_size])
+                violation_count += mask.sum(axis=0)
+                invalid_rows += int(mask.any(axis=1).sum())
+            violations = {name: int(count) for name, count in zip(self.constraint_names, violation_count)}
+            logging.info(f"Invalid rows : [{invalid_rows}/{len(dataframe)}], violated constraints : "
+                         f"{ {name: count for name, count in violations.items() if count > 0} }")
+            return {"rows": len(dataframe), "invalid_rows": invalid_rows, "violations": violations}
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
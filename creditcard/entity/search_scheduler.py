@@ -0,0 +1,362 @@
+from creditcard.exception import CreditCardException
+from creditcard.logger import logging
+from creditcard.entity.cv_result_store import CVResultStore
+
+from sklearn.base import clone
+import sklearn
+from sklearn.metrics import check_scoring
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import tempfile
+import signal
+import threading
+import time
+import sys, os
+try:
+    import resource
+except ImportError:
+    #Not available on Windows, the fit memory limit is not applied there
+    resource = None
+
+#Task chunks per worker, more chunks than workers keeps the pool busy till the end
+CHUNKS_PER_WORKER = 4
+
+SKIPPED_TIME_BUDGET = "time budget"
+SKIPPED_MEMORY_LIMIT = "memory limit"
+SKIPPED_BUDGET_EXHAUSTED = "budget exhausted"
+#Not a budget skip, the candidate raised in fit or score and got the error score like in GridSearchCV
+FIT_FAILED = "fit error"
+
+#Read only state of a search worker, set once per process by the pool initializer
+_search_state = {}
+
+
+class FitTimeoutError(Exception):
+    pass
+
+
+def _raise_fit_timeout(signal_number, frame):
+    raise FitTimeoutError()
+
+
+def _init_search_worker(X_file_path:str, y_file_path:str, estimators:list, candidates:list, splits:list, scoring,
+                        error_score = np.nan, deadline:float = None, fit_time_limit_s:float = None,
+                        fit_memory_limit_mb:int = None):
+    _search_state["X"] = np.load(X_file_path, mmap_mode="r")
+    _search_state["y"] = np.load(y_file_path, mmap_mode="r")
+    _search_state["estimators"] = estimators
+    _search_state["candidates"] = candidates
+    _search_state["splits"] = splits
+    _search_state["scoring"] = scoring
+    _search_state["error_score"] = error_score
+    _search_state["deadline"] = deadline
+    _search_state["fit_time_limit_s"] = fit_time_limit_s
+    if fit_memory_limit_mb and resource is not None:
+        #Address space ceiling of this worker only, an allocation beyond it raises MemoryError inside the fit
+        memory_limit = int(fit_memory_limit_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+
+def _run_within_budget(function, *args):
+    """
+    Run function with a timer of the smaller of the per fit limit and the time left to the deadline.
+    The timer is a SIGALRM, it only interrupts the run on the main thread of a unix process (the
+    search worker processes), elsewhere the run finishes and only later runs are skipped.
+    return: (result, None) or (None, reason the run was skipped)
+    """
+    fit_time_limit = _search_state.get("fit_time_limit_s")
+    deadline_time_limit = None
+    if _search_state.get("deadline") is not None:
+        deadline_time_limit = _search_state["deadline"] - time.time()
+        if deadline_time_limit <= 0:
+            return None, SKIPPED_BUDGET_EXHAUSTED
+    time_limits = [time_limit for time_limit in [fit_time_limit, deadline_time_limit] if time_limit is not None]
+    time_limit = min(time_limits) if time_limits else None
+    #The overall budget runs out first, an interruption is not the fault of this fit
+    timeout_reason = SKIPPED_BUDGET_EXHAUSTED if time_limit is not None and time_limit == deadline_time_limit \
+                     else SKIPPED_TIME_BUDGET
+    is_timed = time_limit is not None and hasattr(signal, "setitimer") \
+               and threading.current_thread() is threading.main_thread()
+    if is_timed:
+        signal.signal(signal.SIGALRM, _raise_fit_timeout)
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+    try:
+        return function(*args), None
+    except FitTimeoutError:
+        return None, timeout_reason
+    except MemoryError:
+        return None, SKIPPED_MEMORY_LIMIT
+    finally:
+        if is_timed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _fit_and_score_fold(model_index:int, candidate_index:int, fold_index:int)->tuple:
+    X, y = _search_state["X"], _search_state["y"]
+    train_index, test_index = _search_state["splits"][fold_index]
+    candidate = _search_state["candidates"][model_index][candidate_index]
+    fit_start = time.perf_counter()
+    try:
+        estimator = clone(_search_state["estimators"][model_index])
+        estimator.set_params(**candidate)
+        estimator.fit(X[train_index], y[train_index])
+        fit_time = time.perf_counter() - fit_start
+        scorer = check_scoring(estimator, scoring=_search_state["scoring"])
+        return scorer(estimator, X[test_index], y[test_index]), fit_time, None
+    except (FitTimeoutError, MemoryError):
+        raise
+    except Exception as e:
+        #A failing candidate scores error_score like in GridSearchCV instead of aborting the search
+        if isinstance(_search_state["error_score"], str) and _search_state["error_score"] == "raise":
+            raise
+        logging.info(f"Fit of {type(_search_state['estimators'][model_index]).__name__} {candidate} "
+                     f"on fold [{fold_index}] failed, scored [{_search_state['error_score']}] : {e}")
+        return _search_state["error_score"], time.perf_counter() - fit_start, FIT_FAILED
+
+
+def _fit_and_score(task:tuple)->tuple:
+    """
+    Fit one candidate of one model on one training fold and score it on the matching test fold
+    task: (model index, candidate index, fold index)
+    return: (model index, candidate index, fold index, score, fit time in seconds, skip reason),
+    score is nan and skip reason set when the fit ran out of time or memory,
+    score is the error score and skip reason FIT_FAILED when the fit or score raised
+    """
+    model_index, candidate_index, fold_index = task
+    fit_start = time.perf_counter()
+    result, skip_reason = _run_within_budget(_fit_and_score_fold, model_index, candidate_index, fold_index)
+    if skip_reason is not None:
+        return model_index, candidate_index, fold_index, np.nan, time.perf_counter() - fit_start, skip_reason
+    score, fit_time, skip_reason = result
+    return model_index, candidate_index, fold_index, score, fit_time, skip_reason
+
+
+def _refit_model(model_index:int, candidate_index:int):
+    estimator = clone(_search_state["estimators"][model_index])
+    estimator.set_params(**_search_state["candidates"][model_index][candidate_index])
+    return estimator.fit(_search_state["X"], _search_state["y"])
+
+
+def _refit(task:tuple):
+    """
+    Refit the best candidate of one model on the whole training data
+    task: (model index, candidate index)
+    return: fitted model, None when the refit ran out of time or memory
+    """
+    model_index, candidate_index = task
+    best_model, skip_reason = _run_within_budget(_refit_model, model_index, candidate_index)
+    if skip_reason is not None:
+        logging.info(f"Refit of model [{model_index}] skipped : {skip_reason}")
+    return best_model
+
+
+class SearchScheduler:
+    def __init__(self, n_jobs:int = None, cv_result_store:CVResultStore = None, time_budget_s:float = None,
+                 model_time_budget_s:float = None, fit_memory_limit_mb:int = None, error_score = np.nan):
+        """
+        Runs the candidate x fold fits of several parameter searches as one pool of tasks.
+        Tasks are interleaved round robin across models, so a model with a large grid does not
+        leave the other workers idle at the end. X and y reach the workers as memory mapped .npy
+        files, only fold indices and fitted scores cross the process boundary.
+        n_jobs: worker processes, None uses every core, 1 fits in this process
+        cv_result_store: fold scores of earlier runs, only the missing fits are scheduled
+        time_budget_s: wall clock seconds of the candidate x fold fits, fits still pending after it are
+        skipped (budget exhausted), running ones are interrupted where _run_within_budget can set its timer
+        model_time_budget_s: fit seconds one model may use summed over its fits, it also bounds a single fit
+        (time budget) where the timer can be set
+        fit_memory_limit_mb: address space ceiling of a worker process, a fit going beyond it is skipped
+        error_score: score of a candidate whose fit or score raises, "raise" aborts the search instead
+        Skipped fits score nan, so their candidates cannot win. With any budget set the fits always run
+        in worker processes, the limits never apply to this process.
+        """
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.cv_result_store = cv_result_store
+        self.time_budget_s = time_budget_s
+        self.model_time_budget_s = model_time_budget_s
+        self.fit_memory_limit_mb = fit_memory_limit_mb
+        self.error_score = error_score
+
+    @staticmethod
+    def get_shared_file_path(array:np.ndarray, temporary_dir:str, name:str)->str:
+        """
+        return: path of a .npy file holding the array, the file already behind a memory map is reused
+        """
+        file_path = getattr(array, "filename", None)
+        if file_path is not None and os.path.exists(file_path):
+            shared_array = np.load(file_path, mmap_mode="r")
+            if shared_array.shape == array.shape and shared_array.dtype == array.dtype:
+                return file_path
+        file_path = os.path.join(temporary_dir, f"{name}.npy")
+        np.save(file_path, np.asarray(array))
+        return file_path
+
+    @staticmethod
+    def get_round_robin_tasks(candidates:list, n_splits:int)->list:
+        """
+        return: (model index, candidate index, fold index) taking one candidate of every model in turn
+        """
+        model_tasks = [[(model_index, candidate_index, fold_index)
+                        for candidate_index in range(len(model_candidates))
+                        for fold_index in range(n_splits)]
+                       for model_index, model_candidates in enumerate(candidates)]
+        tasks = []
+        for position in range(max([len(tasks_of_model) for tasks_of_model in model_tasks] + [0])):
+            tasks.extend(tasks_of_model[position] for tasks_of_model in model_tasks if position < len(tasks_of_model))
+        return tasks
+
+    @staticmethod
+    def get_task_keys(X:np.ndarray, y:np.ndarray, tasks:list, estimators:list, candidates:list,
+                      splits:list, scoring)->list:
+        """
+        return: CV result store key of every task, built from the data fingerprint, estimator class,
+        all estimator parameters, fold indices, scoring and sklearn version
+        """
+        data_fingerprint = CVResultStore.get_data_fingerprint(X, y)
+        fold_fingerprints = [CVResultStore.get_data_fingerprint(train_index, test_index) for train_index, test_index in splits]
+        candidate_fingerprints = []
+        for estimator, model_candidates in zip(estimators, candidates):
+            estimator_name = f"{type(estimator).__module__}.{type(estimator).__name__}"
+            candidate_fingerprints.append([f"{estimator_name}:{sorted(clone(estimator).set_params(**candidate).get_params(deep=True).items())}"
+                                           for candidate in model_candidates])
+        return [CVResultStore.get_key(data_fingerprint, candidate_fingerprints[model_index][candidate_index],
+                                      fold_fingerprints[fold_index], scoring, sklearn.__version__)
+                for model_index, candidate_index, fold_index in tasks]
+    
+    @property
+    def is_budgeted(self)->bool:
+        return any(budget is not None for budget in [self.time_budget_s, self.model_time_budget_s, self.fit_memory_limit_mb])
+    
+    def cancel_over_budget(self, pending:dict, model_fit_time:list, model_index:int, cancel_reasons:dict,
+                           deadline:float = None):
+        """
+        Cancel the pending tasks of a model over its budget, or of every model after the deadline
+        cancel_reasons: filled with the skip reason of every cancelled task position
+        """
+        is_past_deadline = deadline is not None and time.time() >= deadline
+        is_model_over_budget = self.model_time_budget_s is not None and model_fit_time[model_index] >= self.model_time_budget_s
+        if not is_past_deadline and not is_model_over_budget:
+            return
+        for future, (position, task) in pending.items():
+            if (is_past_deadline or task[0] == model_index) and future.cancel():
+                cancel_reasons.setdefault(position, SKIPPED_BUDGET_EXHAUSTED if is_past_deadline else SKIPPED_TIME_BUDGET)
+    
+    def map_tasks(self, function, tasks:list, X:np.ndarray, y:np.ndarray, estimators:list, candidates:list,
+                  splits:list, scoring, deadline:float = None)->list:
+        """
+        return: function applied to every task, on the worker pool or in this process for a single
+        worker without budgets. Fit tasks cancelled for the budget come back as skipped results.
+        deadline: time.time() after which the workers skip their tasks, a running task is interrupted
+        only where _run_within_budget can set its timer
+        """
+        n_jobs = min(self.n_jobs, max(len(tasks), 1))
+        if n_jobs == 1 and not self.is_budgeted:
+            _search_state.update(X=X, y=y, estimators=estimators, candidates=candidates, splits=splits, scoring=scoring,
+                                 error_score=self.error_score)
+            try:
+                return [function(task) for task in tasks]
+            finally:
+                _search_state.clear()
+        with tempfile.TemporaryDirectory() as temporary_dir:
+            X_file_path = SearchScheduler.get_shared_file_path(array=X, temporary_dir=temporary_dir, name="X")
+            y_file_path = SearchScheduler.get_shared_file_path(array=y, temporary_dir=temporary_dir, name="y")
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_search_worker,
+                                     initargs=(X_file_path, y_file_path, estimators, candidates, splits, scoring,
+                                               self.error_score, deadline, self.model_time_budget_s, self.fit_memory_limit_mb)) as executor:
+                if not self.is_budgeted:
+                    chunk_size = max(len(tasks) // (n_jobs * CHUNKS_PER_WORKER), 1)
+                    return list(executor.map(function, tasks, chunksize=chunk_size))
+                
+                #One future per task, so the tasks of a model over budget can still be cancelled
+                futures = {executor.submit(function, task): position for position, task in enumerate(tasks)}
+                pending = {future: (position, tasks[position]) for future, position in futures.items()}
+                model_fit_time = [0.0] * len(estimators)
+                results = [None] * len(tasks)
+                cancel_reasons = {}
+                for future in as_completed(futures):
+                    pending.pop(future, None)
+                    if future.cancelled():
+                        continue
+                    results[futures[future]] = future.result()
+                    if function is _fit_and_score:
+                        model_index, _, _, _, fit_time, _ = results[futures[future]]
+                        model_fit_time[model_index] += fit_time
+                        self.cancel_over_budget(pending=pending, model_fit_time=model_fit_time, model_index=model_index,
+                                                cancel_reasons=cancel_reasons, deadline=deadline)
+                if function is _fit_and_score:
+                    results = [result if result is not None
+                               else (*task, np.nan, 0.0, cancel_reasons.get(position, SKIPPED_BUDGET_EXHAUSTED))
+                               for position, (task, result) in enumerate(zip(tasks, results))]
+                return results
+    
+    def search(self, X:np.ndarray, y:np.ndarray, estimators:list, candidates:list, splits:list, scoring=None)->list:
+        """
+        estimators: unfitted model of every search
+        candidates: list of parameter dicts of every search
+        splits: (train index, test index) of every fold, shared by all searches
+        return: per search dict of best_model (refitted on X, y), best_parameters, best_score and
+        mean_test_score, the first candidate wins a tie like in GridSearchCV.
+        None for a search without any candidate finished within the budgets.
+        """
+        try:
+            deadline = time.time() + self.time_budget_s if self.time_budget_s is not None else None
+            tasks = SearchScheduler.get_round_robin_tasks(candidates=candidates, n_splits=len(splits))
+            scores = [np.full((len(model_candidates), len(splits)), np.nan) for model_candidates in candidates]
+            
+            if self.cv_result_store is not None:
+                task_keys = SearchScheduler.get_task_keys(X=X, y=y, tasks=tasks, estimators=estimators,
+                                                          candidates=candidates, splits=splits, scoring=scoring)
+                stored_results = self.cv_result_store.get_results(keys=task_keys)
+                logging.info(f"Reusing [{len(stored_results)}/{len(tasks)}] fold results of the CV result store")
+                for (model_index, candidate_index, fold_index), task_key in zip(tasks, task_keys):
+                    if task_key in stored_results:
+                        score, _ = stored_results[task_key]
+                        scores[model_index][candidate_index, fold_index] = np.nan if score is None else score
+                key_of_task = dict(zip(tasks, task_keys))
+                tasks = [task for task, task_key in zip(tasks, task_keys) if task_key not in stored_results]
+            
+            logging.info(f"Scheduling [{len(tasks)}] candidate x fold fits of [{len(estimators)}] models on [{self.n_jobs}] workers")
+            results = self.map_tasks(_fit_and_score, tasks, X=X, y=y, estimators=estimators, candidates=candidates,
+                                     splits=splits, scoring=scoring, deadline=deadline)
+            skipped_fits = {}
+            for model_index, candidate_index, fold_index, score, _, skip_reason in results:
+                scores[model_index][candidate_index, fold_index] = score
+                if skip_reason is not None:
+                    skipped_fits.setdefault((type(estimators[model_index]).__name__, skip_reason), []).append(
+                        (candidates[model_index][candidate_index], fold_index))
+            for (model_name, skip_reason), skipped in skipped_fits.items():
+                logging.info(f"Skipped [{len(skipped)}] fits of [{model_name}] for the {skip_reason} : {skipped}")
+            #Skipped and failed fits would come back as finished, they are not stored
+            completed_results = [result for result in results if result[5] is None]
+            if self.cv_result_store is not None and len(completed_results) > 0:
+                self.cv_result_store.save_results(results={key_of_task[(model_index, candidate_index, fold_index)]: (score, fit_time)
+                                                           for model_index, candidate_index, fold_index, score, fit_time, _ in completed_results})
+            
+            mean_test_scores = [model_scores.mean(axis=1) for model_scores in scores]
+            best_indices = [int(np.argmax(np.where(np.isnan(mean_test_score), -np.inf, mean_test_score)))
+                            for mean_test_score in mean_test_scores]
+            #A model none of whose candidates finished every fold is left out. The winners are refitted
+            #after the deadline, only the per fit time and memory limits apply to the refit.
+            refit_tasks = [(model_index, best_index) for model_index, best_index in enumerate(best_indices)
+                           if not np.isnan(mean_test_scores[model_index][best_index])]
+            refitted_models = self.map_tasks(_refit, refit_tasks, X=X, y=y, estimators=estimators,
+                                             candidates=candidates, splits=splits, scoring=scoring)
+            best_models = [None] * len(estimators)
+            for (model_index, _), refitted_model in zip(refit_tasks, refitted_models):
+                best_models[model_index] = refitted_model
+            
+            search_results = []
+            for model_index, best_index in enumerate(best_indices):
+                if best_models[model_index] is None:
+                    logging.info(f"No candidate of [{type(estimators[model_index]).__name__}] finished within budget")
+                    search_results.append(None)
+                    continue
+                search_result = {"best_model": best_models[model_index],
+                                 "best_parameters": candidates[model_index][best_index],
+                                 "best_score": float(mean_test_scores[model_index][best_index]),
+                                 "mean_test_score": mean_test_scores[model_index]}
+                logging.info(f"Best candidate of [{type(estimators[model_index]).__name__}] : "
+                             f"{search_result['best_parameters']} with score [{search_result['best_score']}]")
+                search_results.append(search_result)
+            return search_results
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
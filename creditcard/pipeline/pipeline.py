@@ -14,6 +14,8 @@ class Pipeline:
     def __init__(self, config: Configuration = Configuration()):
         try:
             self.config = config
+            #Background process rendering the data drift report page, see wait_for_report_page
+            self.report_page_process = None
         except Exception as e:
             raise CreditCardException(e, sys) from e
     
@@ -29,7 +31,9 @@ class Pipeline:
         try:
             data_validation = DataValidation(data_validation_config = self.config.get_data_validation_config(),
                                              data_ingestion_artifact = data_ingestion_artifact)
-            return data_validation.initiate_data_validation()
+            data_validation_artifact = data_validation.initiate_data_validation()
+            self.report_page_process = data_validation.report_page_process
+            return data_validation_artifact
         except Exception as e:
             raise CreditCardException(e, sys) from e
     
@@ -50,6 +54,25 @@ class Pipeline:
         except Exception as e:
             raise CreditCardException(e, sys) from e
     
+    def wait_for_report_page(self, data_validation_artifact: DataValidationArtifact) -> DataValidationArtifact:
+        """
+        Join the background report page process and record the page path once the page is saved
+        """
+        try:
+            if self.report_page_process is None:
+                return data_validation_artifact
+            self.report_page_process.join()
+            report_page_file_path = self.config.get_data_validation_config().report_page_file_path
+            if self.report_page_process.exitcode != 0 or not os.path.exists(report_page_file_path):
+                logging.info(f"Data drift report page process failed with exit code : [{self.report_page_process.exitcode}]")
+                return data_validation_artifact
+            self.report_page_process = None
+            data_validation_artifact = data_validation_artifact._replace(report_page_file_path=report_page_file_path)
+            logging.info(f"Data drift report page is ready : [{report_page_file_path}]")
+            return data_validation_artifact
+        except Exception as e:
+            raise CreditCardException(e, sys) from e
+    
     def run_pipeline(self):
         try:
             data_ingestion_artifact = self.start_data_ingestion()
@@ -57,6 +80,8 @@ class Pipeline:
             data_transformation_artifact = self.start_data_transformation(data_ingestion_artifact=data_ingestion_artifact,
                                                                           data_validation_artifact=data_validation_artifact)
             model_trainer_artifact = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
+            data_validation_artifact = self.wait_for_report_page(data_validation_artifact=data_validation_artifact)
+            logging.info(f"Data validation artifact : [{data_validation_artifact}]")
             # data_validation_artifact = self.start_data_validation(data_ingestion_artifact)
             # data_transformation_artifact = self.start_data_transformation(data_ingestion_artifact, data_validation_artifact)
             # model_trainer_artifact = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
@@ -5,6 +5,11 @@ import pandas as pd
 import numpy as np
 import dill
 import yaml
+import hashlib
+import shutil
+
+#Rows parsed per block in compact mode, only one block is ever held at full width
+COMPACT_PARSE_CHUNK_SIZE = 100000
 
 def read_yaml_file(file_path)-> dict:
     """
@@ -45,13 +50,14 @@ def load_data(file_path:str, schema_file_path: str)->pd.DataFrame:
         dataset_schema = read_yaml_file(schema_file_path)
         schema = dataset_schema[DATASET_SCHEMA_COLUMNS_KEY]
         
-        dataframe = pd.read_csv(file_path)
+        #The parser gets the schema dtypes directly instead of inferring them
+        dataframe = read_dataframe(file_path=file_path,
+                                   dtypes=get_schema_dtypes(schema_file_path=schema_file_path),
+                                   compact=dataset_schema.get(SCHEMA_COMPACT_DTYPES_KEY, False))
         error_message = ""
         
         for column in dataframe.columns:
-            if column in list(schema.keys()):
-                dataframe[column].astype(schema[column])
-            else:
+            if column not in schema:
                error_message = f"{error_message}\nColumn : [{column}] is not in the schema ."
         if len(error_message) > 0:
             raise Exception(error_message) 
@@ -73,13 +79,16 @@ def save_numpy_array_data(file_path: str, array: np.array):
     except Exception as e:
         raise CreditCardException(e, sys) from e
     
-def load_numpy_array_data(file_path: str) -> np.array:
+def load_numpy_array_data(file_path: str, mmap_mode: str = None) -> np.array:
     """
     load numpy array data from file
     file_path: str location of file to load
+    mmap_mode: None reads the array into memory, "r" / "r+" / "c" memory map it instead
     return: np.array data loaded
     """
     try:
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, "rb") as file_obj:
             return np.load(file_obj)
     except Exception as e:
@@ -102,4 +111,291 @@ def load_object(file_path:str):
         with open(file_path, "rb") as file_obj:
             return dill.load(file_obj)
     except Exception as e:
-        raise CreditCardException(e, sys) from e
\ No newline at end of file
+        raise CreditCardException(e, sys) from e
+
+def get_file_hash(file_path:str, block_size:int = 1 << 20)->str:
+    """
+    Streaming sha256 of a file, only one block is held in memory at a time
+    file_path: str location of file to hash
+    """
+    try:
+        file_hash = hashlib.sha256()
+        with open(file_path, "rb") as file_obj:
+            for block in iter(lambda: file_obj.read(block_size), b""):
+                file_hash.update(block)
+        return file_hash.hexdigest()
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
+
+def get_path_hash(path:str)->str:
+    """
+    sha256 of a file, or of the relative names and file hashes of a directory such as a columnar dataset
+    """
+    try:
+        if os.path.isfile(path):
+            return get_file_hash(path)
+        path_hash = hashlib.sha256()
+        for dir_path, dir_names, file_names in sorted(os.walk(path)):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                file_path = os.path.join(dir_path, file_name)
+                path_hash.update(f"{os.path.relpath(file_path, path)}:{get_file_hash(file_path)}\n".encode())
+        return path_hash.hexdigest()
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
+
+def link_or_copy(source_path:str, destination_path:str):
+    """
+    Hard link when source and destination are on the same file system, copy otherwise
+    """
+    try:
+        os.link(source_path, destination_path)
+    except OSError:
+        shutil.copy(src=source_path, dst=destination_path)
+
+def get_schema_dtypes(schema_file_path:str)->dict:
+    """
+    Column name to numpy dtype mapping in the column order of schema.yaml
+    """
+    try:
+        dataset_schema = read_yaml_file(schema_file_path)
+        return {column: np.dtype(dtype) for column, dtype in dataset_schema[DATASET_SCHEMA_COLUMNS_KEY].items()}
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
+
+def get_compact_dtype(dtype:np.dtype, min_value, max_value)->np.dtype:
+    """
+    Smallest signed integer type holding [min_value, max_value] for integer columns, float32 for float columns
+    """
+    try:
+        dtype = np.dtype(dtype)
+        if dtype.kind == "f":
+            return np.dtype(np.float32)
+        if dtype.kind in "iu":
+            for compact_dtype in (np.int8, np.int16, np.int32, np.int64):
+                type_info = np.iinfo(compact_dtype)
+                if type_info.min <= min_value and max_value <= type_info.max:
+                    return np.dtype(compact_dtype)
+        return dtype
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
+
+def get_nullable_dtype(dtype:np.dtype):
+    """
+    Pandas nullable integer type (Int64, UInt8, ...) of a numpy integer type
+    """
+    dtype = np.dtype(dtype)
+    return pd.api.types.pandas_dtype(f"{'UInt' if dtype.kind == 'u' else 'Int'}{dtype.itemsize * 8}")
+
+def is_nullable_integer(dtype)->bool:
+    return isinstance(dtype, pd.api.extensions.ExtensionDtype) and dtype.kind in "iu"
+
+def get_parse_dtypes(dtypes:dict, compact:bool = False)->dict:
+    """
+    Parser dtypes of the schema dtypes. Integer columns are parsed as nullable integers,
+    so a missing value reaches the schema constraints instead of failing the parse.
+    compact: float columns are parsed as float32 directly. Integer columns keep their schema width,
+    the parser silently wraps values that do not fit a narrower type, so they are downcast
+    from the parsed values instead.
+    """
+    try:
+        if dtypes is None:
+            return None
+        parse_dtypes = {}
+        for column, dtype in dtypes.items():
+            dtype = np.dtype(dtype)
+            if dtype.kind in "iu":
+                parse_dtypes[column] = get_nullable_dtype(dtype)
+            elif dtype.kind == "f" and compact:
+                parse_dtypes[column] = np.dtype(np.float32)
+            else:
+                parse_dtypes[column] = dtype
+        return parse_dtypes
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
+
+def narrow_nullable_dtypes(dataframe:pd.DataFrame)->pd.DataFrame:
+    """
+    Convert the nullable integer columns without missing values back to numpy integers in place,
+    only columns that really hold nulls keep the nullable type
+    """
+    try:
+        for column in dataframe.columns:
+            column_value = dataframe[column]
+            if is_nullable_integer(column_value.dtype) and not column_value.hasnans:
+                dataframe[column] = column_value.to_numpy(dtype=column_value.dtype.numpy_dtype)
+        return dataframe
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
+
+def get_column_storage(column_value:pd.Series, dtype)->tuple:
+    """
+    Numpy values of a column in the given dtype and the mask of its missing values,
+    missing integers are stored as 0 and the mask is None when nothing is missing
+    """
+    if not is_nullable_integer(column_value.dtype):
+        return column_value.to_numpy(dtype=dtype), None
+    is_missing = column_value.isna().to_numpy()
+    return column_value.to_numpy(dtype=dtype, na_value=0), is_missing if is_missing.any() else None
+
+def downcast_dataframe(dataframe:pd.DataFrame)->pd.DataFrame:
+    """
+    Downcast every numeric column in place, one column at a time.
+    Only integer columns need their value range, float columns go to float32 directly.
+    """
+    try:
+        for column in dataframe.columns:
+            column_value = dataframe[column]
+            if is_nullable_integer(column_value.dtype):
+                #Nullable columns keep a nullable type, all null columns have no range to downcast to
+                if column_value.notna().any():
+                    numpy_dtype = column_value.dtype.numpy_dtype
+                    compact_dtype = get_compact_dtype(numpy_dtype, column_value.min(), column_value.max())
+                    if compact_dtype != numpy_dtype:
+                        dataframe[column] = column_value.astype(get_nullable_dtype(compact_dtype))
+            elif column_value.dtype.kind == "f" and column_value.dtype.itemsize > 4:
+                dataframe[column] = column_value.astype(np.float32)
+            elif column_value.dtype.kind in "iu" and len(column_value) > 0:
+                compact_dtype = get_compact_dtype(column_value.dtype, column_value.min(), column_value.max())
+                if compact_dtype != column_value.dtype:
+                    dataframe[column] = column_value.astype(compact_dtype)
+        return dataframe
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
+
+def save_columnar_data(dir_path:str, dataframe:pd.DataFrame, dtypes:dict):
+    """
+    Save every column as its own .npy file with the schema dtype,
+    integer columns holding nulls get a second file with their missing value mask
+    dir_path: str directory holding one file per column
+    dtypes: dict column name to dtype, also gives the column order
+    """
+    try:
+        os.makedirs(dir_path, exist_ok=True)
+        for column, dtype in dtypes.items():
+            if is_nullable_integer(dtype):
+                dtype = dtype.numpy_dtype
+            values, is_missing = get_column_storage(dataframe[column], dtype)
+            np.save(os.path.join(dir_path, f"{column}{COLUMNAR_FILE_EXTENSION}"), values)
+            if is_missing is not None:
+                np.save(os.path.join(dir_path, f"{column}{COLUMNAR_MASK_FILE_SUFFIX}{COLUMNAR_FILE_EXTENSION}"), is_missing)
+        write_yaml_file(file_path=os.path.join(dir_path, COLUMNAR_META_FILE_NAME),
+                        data={"columns": list(dtypes.keys()), "rows": len(dataframe)})
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
+
+def convert_csv_to_columnar(csv_file_path:str, dir_path:str, dtypes:dict, chunk_size:int, compact:bool = False):
+    """
+    Columnar copy of a csv file that never holds more than one chunk in memory.
+    The first pass counts the rows (and in compact mode tracks the integer columns' range to pick their dtype),
+    the second one fills preallocated memory mapped column files.
+    """
+    try:
+        parse_dtypes = get_parse_dtypes(dtypes, compact=compact)
+        if compact:
+            integer_columns = [column for column, dtype in parse_dtypes.items() if is_nullable_integer(dtype)]
+            number_of_rows = 0
+            min_value = {}
+            max_value = {}
+            for chunk in pd.read_csv(csv_file_path, dtype=parse_dtypes, usecols=integer_columns or None, chunksize=chunk_size):
+                number_of_rows += len(chunk)
+                if len(integer_columns) == 0:
+                    continue
+                chunk_min = chunk[integer_columns].min()
+                chunk_max = chunk[integer_columns].max()
+                for column in integer_columns:
+                    #Columns that are all null in this chunk have no range
+                    if pd.isna(chunk_min[column]):
+                        continue
+                    min_value[column] = min(min_value.get(column, chunk_min[column]), chunk_min[column])
+                    max_value[column] = max(max_value.get(column, chunk_max[column]), chunk_max[column])
+            dtypes = {column: get_compact_dtype(dtype, min_value.get(column, 0), max_value.get(column, 0))
+                      for column, dtype in dtypes.items()}
+        else:
+            dtypes = {column: np.dtype(dtype) for column, dtype in dtypes.items()}
+            with open(csv_file_path, "rb") as csv_file:
+                number_of_rows = sum(block.count(b"\n") for block in iter(lambda: csv_file.read(1 << 20), b"")) - 1
+        os.makedirs(dir_path, exist_ok=True)
+        column_arrays = {column: np.lib.format.open_memmap(os.path.join(dir_path, f"{column}{COLUMNAR_FILE_EXTENSION}"),
+                                                           mode="w+", dtype=dtype, shape=(number_of_rows,))
+                         for column, dtype in dtypes.items()}
+        #Mask files are only created for the integer columns that turn out to hold nulls
+        mask_arrays = {}
+        row_offset = 0
+        for chunk in pd.read_csv(csv_file_path, dtype=parse_dtypes, chunksize=chunk_size):
+            rows = slice(row_offset, row_offset + len(chunk))
+            for column, column_array in column_arrays.items():
+                column_array[rows], is_missing = get_column_storage(chunk[column], column_array.dtype)
+                if is_missing is None:
+                    continue
+                if column not in mask_arrays:
+                    mask_arrays[column] = np.lib.format.open_memmap(
+                        os.path.join(dir_path, f"{column}{COLUMNAR_MASK_FILE_SUFFIX}{COLUMNAR_FILE_EXTENSION}"),
+                        mode="w+", dtype=np.bool_, shape=(number_of_rows,))
+                mask_arrays[column][rows] = is_missing
+            row_offset += len(chunk)
+        for column_array in list(column_arrays.values()) + list(mask_arrays.values()):
+            column_array.flush()
+        if row_offset != number_of_rows:
+            raise Exception(f"Expected [{number_of_rows}] rows in [{csv_file_path}] but read [{row_offset}]")
+        write_yaml_file(file_path=os.path.join(dir_path, COLUMNAR_META_FILE_NAME),
+                        data={"columns": list(dtypes.keys()), "rows": number_of_rows})
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
+
+def load_columnar_data(dir_path:str, mmap_mode:str = "r")->pd.DataFrame:
+    """
+    Load a columnar directory as DataFrame, the column files are memory mapped and not copied when possible.
+    Integer columns saved with a missing value mask are loaded as nullable integers.
+    """
+    try:
+        columnar_meta = read_yaml_file(os.path.join(dir_path, COLUMNAR_META_FILE_NAME))
+        columns = {}
+        for column in columnar_meta["columns"]:
+            values = np.load(os.path.join(dir_path, f"{column}{COLUMNAR_FILE_EXTENSION}"), mmap_mode=mmap_mode)
+            mask_file_path = os.path.join(dir_path, f"{column}{COLUMNAR_MASK_FILE_SUFFIX}{COLUMNAR_FILE_EXTENSION}")
+            if os.path.exists(mask_file_path):
+                values = pd.arrays.IntegerArray(np.asarray(values), np.load(mask_file_path))
+            columns[column] = values
+        return pd.DataFrame(columns, copy=False)
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
+
+def iter_dataframe_chunks(file_path:str, chunk_size:int, dtypes:dict = None):
+    """
+    Yield an ingested dataset block by block, csv files are parsed chunk by chunk and
+    columnar directories are sliced out of their memory mapped columns
+    """
+    try:
+        if os.path.isdir(file_path):
+            dataframe = load_columnar_data(dir_path=file_path)
+            for start in range(0, len(dataframe), chunk_size):
+                yield dataframe.iloc[start:start + chunk_size]
+        else:
+            for chunk in pd.read_csv(file_path, dtype=get_parse_dtypes(dtypes), chunksize=chunk_size):
+                yield narrow_nullable_dtypes(chunk)
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
+
+def read_dataframe(file_path:str, dtypes:dict = None, compact:bool = False)->pd.DataFrame:
+    """
+    Read an ingested dataset, either a columnar directory (stored dtypes are kept) or a csv file
+    dtypes: dict column name to dtype given to the csv parser, integer columns holding nulls
+    are returned as nullable integers so the schema constraints can report them
+    compact: parse float columns as float32 and downcast the integer columns block by block,
+    so the full width frame is never built
+    """
+    try:
+        if os.path.isdir(file_path):
+            return load_columnar_data(dir_path=file_path)
+        parse_dtypes = get_parse_dtypes(dtypes, compact=compact)
+        if not compact:
+            return narrow_nullable_dtypes(pd.read_csv(file_path, dtype=parse_dtypes))
+        chunks = [downcast_dataframe(chunk) for chunk in pd.read_csv(file_path, dtype=parse_dtypes,
+                                                                     chunksize=COMPACT_PARSE_CHUNK_SIZE)]
+        if len(chunks) == 0:
+            return narrow_nullable_dtypes(pd.read_csv(file_path, dtype=parse_dtypes))
+        #Blocks downcast to different integer widths are unified to the widest one
+        return narrow_nullable_dtypes(pd.concat(chunks, ignore_index=True))
+    except Exception as e:
+        raise CreditCardException(e, sys) from e
@@ -0,0 +1,42 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from creditcard.util.util import read_dataframe, convert_csv_to_columnar
+from creditcard.entity.schema_constraint import SchemaConstraints
+
+DTYPES = {"ID": np.dtype(np.int64), "AGE": np.dtype(np.int64), "LIMIT_BAL": np.dtype(np.float64)}
+CONSTRAINTS = {"not_null": ["ID", "AGE", "LIMIT_BAL"], "ranges": {"AGE": {"min": 18, "max": 100}}}
+
+
+@pytest.fixture
+def csv_file_path(tmp_path):
+    csv_file_path = os.path.join(tmp_path, "creditcard.csv")
+    with open(csv_file_path, "w") as csv_file:
+        csv_file.write("ID,AGE,LIMIT_BAL\n1,30,1000.0\n2,,2000.0\n3,45,3000.0\n")
+    return csv_file_path
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_null_in_int_column_is_counted(csv_file_path, compact):
+    dataframe = read_dataframe(file_path=csv_file_path, dtypes=DTYPES, compact=compact)
+    report = SchemaConstraints(constraints=CONSTRAINTS).count_violations(dataframe=dataframe, chunk_size=2)
+    assert dataframe["AGE"].dtype.kind == "i"
+    assert report["invalid_rows"] == 1
+    assert report["violations"]["not_null:AGE"] == 1
+    assert report["violations"]["ranges:AGE"] == 0
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_null_in_int_column_survives_columnar_format(csv_file_path, tmp_path, compact):
+    dir_path = os.path.join(tmp_path, "columnar")
+    convert_csv_to_columnar(csv_file_path=csv_file_path, dir_path=dir_path, dtypes=DTYPES, chunk_size=2, compact=compact)
+    dataframe = read_dataframe(file_path=dir_path)
+    assert dataframe["AGE"].isna().tolist() == [False, True, False]
+    assert dataframe["ID"].dtype == (np.int8 if compact else np.int64)
+
+
+def test_int_column_without_null_stays_numpy(csv_file_path):
+    dataframe = read_dataframe(file_path=csv_file_path, dtypes=DTYPES)
+    assert isinstance(dataframe["ID"].dtype, np.dtype)
+    assert isinstance(dataframe["AGE"].dtype, pd.Int64Dtype)